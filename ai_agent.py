@@ -1,51 +1,397 @@
 import numpy as np
 from board import Board
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from evaluation import evaluate_boards, evaluate_lines, EvaluationCache, WIN_SCORE
+from opening_book import load_book
+from solver import Solver, SearchTimeout
+from mcts import MCTS
+from board_batch import fits
+from search_stats import SearchStats, SamplingProfiler, timed, PHASES
 import random
 import math
+import time
+import threading
+
+# mixed into the position key so max and min nodes never share an entry
+MAXIMIZING_KEY = 0x9E3779B97F4A7C15
+# nodes between checks of the deadline and the cancel event
+CHECK_INTERVAL = 64
 
 class Connect4AI:
-    def __init__(self, max_depth=4, strategy='minimax'):
+    def __init__(self, max_depth=4, strategy='minimax', tt_size_mb=16, time_limit_ms=None,
+                 workers=1, parallel_mode='root', book_path=None, solver_threshold=14,
+                 stats_callback=None, timing=False, profile=False, playouts=20000,
+                 eval_cache_size=100000):
         self.max_depth = max_depth
         self.strategy = strategy
         self.temp = 1.0  # for SA
+        # kept between get_move calls so later moves reuse earlier searches
+        self.tt_size_mb = tt_size_mb
+        self.tt = TranspositionTable(tt_size_mb)
+        # heuristic scores of positions, shared by every strategy and kept
+        # for the whole game so each position is evaluated once
+        self.eval_cache = EvaluationCache(eval_cache_size)
+        # with a time limit minimax deepens until the budget runs out,
+        # otherwise it stops at max_depth
+        self.time_limit_ms = time_limit_ms
+        self.deadline = None
+        # a threading.Event, once set the running search stops early
+        self.cancel_event = None
+        self.nodes = 0
+        # node count of the next deadline check, score_leaves adds many
+        # nodes at once so the count can step over any fixed multiple
+        self.next_check = 0
+        self.depth_reached = 0
+        self.score = None  # root score of the last completed search, if known
+        self.source = None  # 'solver', 'parallel' or 'search', see get_best_move_minimax
+        self.leaf_evals = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # move ordering: killer moves per ply and history scores per (player, col)
+        self.killers = {}
+        self.history_scores = {}
+        # minimax over a process pool when workers > 1, 'root' splits the
+        # root columns between workers, 'lazy_smp' has every worker search
+        # the whole root through one shared transposition table
+        self.workers = workers
+        self.parallel_mode = parallel_mode
+        self.parallel = None  # created on first use and kept between moves
+        # positions with at most solver_threshold empty cells are solved
+        # exactly instead of searched to max_depth, None turns this off
+        self.solver_threshold = solver_threshold
+        self.solver = None
+        # the mcts strategy plays up to `playouts` random games per move, or
+        # as many as fit in time_limit_ms
+        self.playouts = playouts
+        self.mcts = None
+        # pondering on the opponent's time, see start_pondering
+        self.ponderer = None
+        self.ponder_thread = None
+        self.ponder_event = None
+        self.pondered = {}
+        self.resume = None
+        # opening book looked up before searching, mapped on first use
+        self.book = load_book(book_path) if book_path is not None else None
+        # instrumentation: every get_move builds a SearchStats, passed to
+        # stats_callback if set. timing wraps the hot methods with timers and
+        # profile samples the search stack, both are off by default and cost
+        # nothing then
+        self.stats_callback = stats_callback
+        self.profile = profile
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.timing = timing
+        if timing:
+            self.order_moves = timed(self.order_moves, self.phase_times, 'generation')
+            self.evaluate_leaf = timed(self.evaluate_leaf, self.phase_times, 'evaluation')
+            self.evaluate_children = timed(self.evaluate_children, self.phase_times, 'evaluation')
+            self.check_terminal = timed(self.check_terminal, self.phase_times, 'terminal')
+
+    def new_game(self):
+        # forget positions searched in a previous game
+        self.stop_pondering()
+        self.pondered = {}
+        self.tt.clear()
+        self.eval_cache.clear()
+        self.history_scores.clear()  # shared with the pondering engine
+        if self.solver is not None:
+            self.solver.tt.clear()
+        if self.parallel is not None:
+            self.parallel.new_game()
+
+    def close(self):
+        # stop pondering and shut down the worker pool of a parallel search
+        self.stop_pondering()
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
         
-    def get_move(self, board):
+    def get_move(self, board, return_stats=False):
+        # returns the move, or (move, SearchStats) with return_stats=True
+        start = time.perf_counter()
+        self.nodes = self.leaf_evals = self.cutoffs = self.first_move_cutoffs = 0
+        self.next_check = 0
+        self.depth_reached = 0
+        self.score = None
+        for phase in PHASES:
+            self.phase_times[phase] = 0.0
+        tt_probes, tt_hits = self.tt.probes, self.tt.hits
+        eval_hits, eval_misses = self.eval_cache.hits, self.eval_cache.misses
+        profiler = None
+        if self.profile:
+            profiler = SamplingProfiler()
+            profiler.start()
+
+        try:
+            move, source = self.choose_move(board)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+
+        stats = SearchStats(
+            self.strategy, source, self.nodes, self.leaf_evals, self.cutoffs,
+            self.first_move_cutoffs, self.depth_reached, self.tt.probes - tt_probes,
+            self.tt.hits - tt_hits, time.perf_counter() - start,
+            dict(self.phase_times) if self.timing else None,
+            profiler.report() if profiler is not None else None, self.score,
+            self.eval_cache.hits - eval_hits, self.eval_cache.misses - eval_misses)
+        if self.stats_callback is not None:
+            self.stats_callback(stats)
+        if return_stats:
+            return move, stats
+        return move
+
+    def choose_move(self, board):
+        # (move, where it came from)
         # first check if there are any valid moves
         valid_moves = board.get_valid_moves()
         if not valid_moves:
-            return None
-            
+            return None, None
+
+        if self.book is not None:
+            move = self.book.lookup(board)
+            if move is not None and board.is_valid_move(move):
+                return move, 'book'
+
+        source = self.strategy
         if self.strategy == 'minimax':
-            move = self.get_best_move_minimax(board)
+            move, source = self.resume_pondering(board), 'ponder'
+            if move is None:
+                start_depth, pv_move, time_limit_ms = self.resume or (1, None, None)
+                self.resume = None
+                move = self.get_best_move_minimax(board, start_depth, pv_move, time_limit_ms)
+                source = self.source
         elif self.strategy == 'hill_climbing':
             move = self.hill_climbing_move(board)
         elif self.strategy == 'simulated_annealing':
             move = self.simulated_annealing_move(board)
+        elif self.strategy == 'mcts':
+            if fits(board.rows, board.cols):
+                move = self.mcts_move(board)
+            else:
+                # playouts need 64-bit bitboards, larger boards are searched
+                move = self.get_best_move_minimax(board)
+                source = self.source
         
         # if the strategy didn't return a valid move, returning first valid move
         if move is None or not board.is_valid_move(move):
-            return valid_moves[0]
+            return valid_moves[0], source
             
+        return move, source
+
+    def get_best_move_minimax(self, board, start_depth=1, pv_move=None, time_limit_ms=None):
+        # start_depth/pv_move resume a search whose earlier depths are done,
+        # time_limit_ms overrides the engine's own budget for this call.
+        # self.source records which path found the move
+        start = time.perf_counter()
+        if time_limit_ms is None:
+            time_limit_ms = self.time_limit_ms
+        empty_cells = board.rows * board.cols - board.moves
+        if self.solver_threshold is not None and empty_cells <= self.solver_threshold:
+            # the solver gets half the time budget, a position it cannot
+            # solve in time is searched for the rest
+            deadline = None
+            if time_limit_ms is not None:
+                deadline = start + time_limit_ms / 2000
+            try:
+                move = self.solve_endgame(board, deadline)
+                self.source = 'solver'
+                return move
+            except SearchTimeout:
+                pass
+        if self.workers > 1:
+            self.source = 'parallel'
+            if time_limit_ms is not None:  # less whatever the solver used
+                time_limit_ms -= (time.perf_counter() - start) * 1000
+            return self.parallel_move(board, time_limit_ms)
+        self.source = 'search'
+
+        self.nodes = self.next_check = 0
+        self.depth_reached = start_depth - 1
+        self.killers = {}
+        for key in self.history_scores:
+            self.history_scores[key] //= 2  # age scores from the last move
+
+        if time_limit_ms is None:
+            self.deadline = None
+            max_depth = self.max_depth
+        else:
+            self.deadline = start + time_limit_ms / 1000
+            max_depth = board.rows * board.cols - board.moves
+
+        # iterative deepening, keeping the move of the last completed depth
+        start_moves = board.moves
+        best_move = pv_move
+        for depth in range(start_depth, max_depth + 1):
+            try:
+                best_move = self.search_root(board, depth, best_move)
+            except SearchTimeout:
+                # unwind the moves of the interrupted search
+                while board.moves > start_moves:
+                    board.undo_move(board.last_move[1])
+                break
+            self.depth_reached = depth
+            # depth 1 always completes so there is a move to return
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                break
+        self.deadline = None
+        return best_move
+
+    def start_pondering(self, board):
+        # Search the opponent's likely replies in a background thread while
+        # they think. board has the opponent to move and is copied. The
+        # pondering engine shares this engine's transposition table, so the
+        # bounds and best moves it finds are reused by the next get_move.
+        self.stop_pondering()
+        if self.ponderer is None:
+            self.ponderer = Connect4AI(self.max_depth, self.strategy, self.tt_size_mb, self.time_limit_ms,
+                                       solver_threshold=self.solver_threshold)
+            self.ponderer.tt = self.tt
+            self.ponderer.eval_cache = self.eval_cache
+            self.ponderer.history_scores = self.history_scores
+        self.pondered = {}
+        self.ponder_event = threading.Event()
+        self.ponderer.cancel_event = self.ponder_event
+        self.ponder_thread = threading.Thread(target=self.ponder, args=(board.copy(),), daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        if self.ponder_thread is not None:
+            self.ponder_event.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
+    def ponder(self, board):
+        # replies in the order our last search expected them, each searched
+        # as deep as a normal move would be
+        key, mirrored = self.tt_key(board)
+        entry = self.tt.probe(key)
+        predicted = None
+        if entry is not None and entry[4] is not None:
+            predicted = board.cols - 1 - entry[4] if mirrored else entry[4]
+        for reply in self.ponderer.order_moves(board, predicted):
+            if self.ponder_event.is_set():
+                break
+            board.make_move(reply)
+            if not board.is_terminal():
+                start = time.perf_counter()
+                move = self.ponderer.get_best_move_minimax(board)
+                if move is not None and self.ponderer.depth_reached > 0:
+                    self.pondered[board.zobrist, board.current_player] = (
+                        move, self.ponderer.depth_reached, time.perf_counter() - start)
+            board.undo_move(reply)
+
+    def resume_pondering(self, board):
+        # After the opponent moved: keep what was pondered for the reply they
+        # played and drop the rest. Returns the move when the pondered search
+        # already covers this move's depth or time budget, otherwise None
+        # after setting up the search to carry on from the pondered depth.
+        self.stop_pondering()
+        record = self.pondered.get((board.zobrist, board.current_player))
+        self.pondered = {}
+        self.resume = None
+        if record is None:
+            return None
+        move, depth, elapsed = record
+        if not board.is_valid_move(move):
+            return None
+        if self.time_limit_ms is None:
+            if depth >= self.max_depth:
+                self.depth_reached = depth
+                return move
+            self.resume = (depth + 1, move, None)
+        else:
+            remaining_ms = self.time_limit_ms - elapsed * 1000
+            if remaining_ms <= 0:
+                self.depth_reached = depth
+                return move
+            self.resume = (depth + 1, move, remaining_ms)
+        return None
+
+    def solve_endgame(self, board, deadline=None):
+        # raises SearchTimeout after deadline or once cancel_event is set
+        if self.solver is None:
+            self.solver = Solver(self.tt_size_mb)
+        self.solver.deadline = deadline
+        self.solver.cancel_event = self.cancel_event
+        self.score, move = self.solver.solve(board)
+        self.nodes = self.solver.nodes
+        self.depth_reached = board.rows * board.cols - board.moves
+        return move
+
+    def mcts_move(self, board):
+        if self.mcts is None:
+            self.mcts = MCTS(self.playouts, self.time_limit_ms)
+        self.mcts.playouts, self.mcts.time_limit_ms = self.playouts, self.time_limit_ms
+        move, self.score = self.mcts.search(board)
+        self.nodes = self.mcts.played
+        self.depth_reached = self.mcts.depth_reached
+        return move
+
+    def parallel_move(self, board, time_limit_ms=None):
+        # imported here because parallel_search imports this module
+        from parallel_search import ParallelSearch
+        if self.parallel is None:
+            config = {'max_depth': self.max_depth, 'tt_size_mb': self.tt_size_mb}
+            self.parallel = ParallelSearch(self.workers, config, self.parallel_mode,
+                                           self.tt_size_mb)
+        move, self.depth_reached, self.nodes = self.parallel.search(
+            board, self.max_depth, time_limit_ms)
         return move
 
-    def get_best_move_minimax(self, board):
+    def search_root(self, board, depth, pv_move):
         best_score = float('-inf')
         best_move = None
         alpha = float('-inf')
         beta = float('inf')
-        
-        for col in board.get_valid_moves():
+        if depth == 1:
+            deadline, self.deadline = self.deadline, None
+
+        for col in self.order_moves(board, pv_move):
             board.make_move(col)
-            score = self.minimax(board, self.max_depth - 1, False, alpha, beta)
+            score = self.minimax(board, depth - 1, False, alpha, beta)
             board.undo_move(col)
-            
-            if score > best_score:
+
+            if score > best_score or best_move is None:
                 best_score = score
                 best_move = col
             alpha = max(alpha, best_score)
-            
+
+        if depth == 1:
+            self.deadline = deadline
+        self.score = best_score
         return best_move
 
+    def order_moves(self, board, pv_move=None):
+        # center columns first, then by history score, then killer moves of
+        # this ply and the principal variation move, forced blocks go before
+        # all of them
+        center = (board.cols - 1) / 2
+        moves = sorted(board.get_valid_moves(), key=lambda col: abs(col - center))
+        player = board.current_player
+        moves.sort(key=lambda col: -self.history_scores.get((player, col), 0))
+        for killer in reversed(self.killers.get(board.moves, ())):
+            if killer in moves:
+                moves.remove(killer)
+                moves.insert(0, killer)
+        if pv_move in moves:
+            moves.remove(pv_move)
+            moves.insert(0, pv_move)
+        for block in board.must_block(player):
+            moves.remove(block)
+            moves.insert(0, block)
+        return moves
+
+    def record_cutoff(self, board, col, depth, first):
+        # the move that caused a beta cutoff becomes a killer for this ply
+        self.cutoffs += 1
+        self.first_move_cutoffs += first
+        killers = self.killers.setdefault(board.moves, [])
+        if col not in killers:
+            killers.insert(0, col)
+            del killers[2:]
+        key = (board.current_player, col)
+        self.history_scores[key] = self.history_scores.get(key, 0) + depth * depth
+
     def hill_climbing_move(self, board):
         # start with all valid moves and their scores
         moves = board.get_valid_moves()
@@ -109,112 +455,193 @@ class Connect4AI:
         return best_move
 
     def evaluate_position(self, board, move):
-        score = 0
-        # make the move temporarily
+        # make the move temporarily and score the resulting grid
         board.make_move(move)
-        
-        # heuristic
-        score += self.evaluate_center_control(board) * 3
-        score += self.evaluate_winning_potential(board) * 10
-        score += self.evaluate_blocking_opponent(board) * 8
-        score += self.evaluate_connectivity(board) * 5
-        
-        # undo the move
+        score = self.evaluate_leaf(board)
         board.undo_move(move)
         return score
 
-    def evaluate_center_control(self, board):
-        # evaluate control of center columns
-        center_col = board.cols // 2
-        center_count = 0
-        for row in range(board.rows):
-            if board.board[row][center_col] == 2:  # ai pieces
-                center_count += 1
-        return center_count
-
-    def evaluate_winning_potential(self, board):
-        # evaluate potential winning moves
-        score = 0
-        # check for potential wins in next move
-        for col in board.get_valid_moves():
-            board.make_move(col)
-            if board.check_winner() == 2:  # ai wins
-                score += 100
-            board.undo_move(col)
-        return score
+    def tt_key(self, board):
+        # (key, mirrored) of the transposition table. Only odd widths fold
+        # mirror images together, on even widths the evaluator's center
+        # column breaks the symmetry, see eval_key
+        return board.position_key(mirror=board.cols % 2 == 1)
 
-    def evaluate_blocking_opponent(self, board):
-        # evaluate blocking opponent's winning moves
-        score = 0
-        # checking if opponent would win in their next move
-        for col in board.get_valid_moves():
-            board.make_move(col)
-            board.current_player = 1  # simulating opponent's turn
-            for opp_col in board.get_valid_moves():
-                board.make_move(opp_col)
-                if board.check_winner() == 1:  # opponent would win
-                    score -= 50
-                board.undo_move(opp_col)
-            board.current_player = 2  # reset to ai's turn
-            board.undo_move(col)
-        return score
+    def eval_key(self, board, col=None):
+        # cache key of the position, or of the position after col is played,
+        # with the side to move as the score depends on it. The evaluation
+        # is symmetric on odd widths, mirror images share a key
+        zobrist, mirror = board.zobrist, board.mirror_zobrist
+        to_move = board.current_player
+        if col is not None:
+            key, mirror_key = board.cell_keys(board.current_player, col, board.heights[col])
+            zobrist ^= key
+            mirror ^= mirror_key
+            to_move = 3 - to_move
+        if to_move == 2:
+            zobrist ^= board.side_key
+            mirror ^= board.side_key
+        return min(zobrist, mirror) if board.cols % 2 else zobrist
 
-    def evaluate_connectivity(self, board):
-        # evaluate piece connectivity for potential future wins
-        score = 0
-        directions = [(0,1), (1,0), (1,1), (1,-1)]
-        
-        for row in range(board.rows):
-            for col in range(board.cols):
-                if board.board[row][col] == 2:  # ai piece
-                    for dr, dc in directions:
-                        connected = 0
-                        r, c = row, col
-                        # count connected pieces
-                        while (0 <= r < board.rows and 0 <= c < board.cols and 
-                               board.board[r][c] == 2):
-                            connected += 1
-                            r += dr
-                            c += dc
-                        score += connected ** 2  # square for emphasis on longer connections
+    def evaluate_leaf(self, board):
+        self.leaf_evals += 1
+        key = self.eval_key(board)
+        score = self.eval_cache.get(key)
+        if score is None:
+            if board.sparse:
+                score = evaluate_lines(board)
+            else:
+                score = evaluate_boards(board.board, connect=board.connect,
+                                        to_move=board.current_player)
+            self.eval_cache.put(key, score)
         return score
 
+    def check_terminal(self, board):
+        return board.check_winner()
+
+    def evaluate_children(self, board, moves):
+        # score the position after each of moves, the ones not cached in
+        # one evaluator call
+        self.leaf_evals += len(moves)
+        keys = [self.eval_key(board, col) for col in moves]
+        scores = [self.eval_cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            fresh = self.score_children(board, [moves[i] for i in missing])
+            for i, score in zip(missing, fresh.tolist()):
+                scores[i] = score
+                self.eval_cache.put(keys[i], score)
+        return np.array(scores)
+
+    def score_children(self, board, moves):
+        if board.sparse:
+            # large boards keep line counters, one child at a time is cheaper
+            # than building grids
+            scores = []
+            for col in moves:
+                board.make_move(col)
+                scores.append(evaluate_lines(board))
+                board.undo_move(col)
+            return np.array(scores)
+        children = np.repeat(board.board[np.newaxis], len(moves), axis=0)
+        rows = [board.rows - 1 - board.heights[col] for col in moves]
+        children[np.arange(len(moves)), rows, moves] = board.current_player
+        return evaluate_boards(children, connect=board.connect, to_move=3 - board.current_player)
+
     def minimax(self, board, depth, is_maximizing, alpha, beta):
-        if depth == 0 or board.is_terminal():
-            # if game is over, will evaluate without requiring a valid move
-            if board.is_terminal():
-                winner = board.check_winner()
-                if winner == 2:  # ai wins
-                    return float('inf')
-                elif winner == 1:  # player wins
-                    return float('-inf')
-                else:  # draw
-                    return 0
-            # for non-terminal states, evaluate normally
-            valid_moves = board.get_valid_moves()
-            if not valid_moves:
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.next_check = self.nodes + CHECK_INTERVAL
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise SearchTimeout()
+
+        # if game is over, will evaluate without requiring a valid move
+        winner = self.check_terminal(board)
+        if winner is not None:
+            if winner == 2:  # ai wins
+                return float('inf')
+            elif winner == 1:  # player wins
+                return float('-inf')
+            else:  # draw
                 return 0
-            return self.evaluate_position(board, valid_moves[0])
-        
+
+        # the player to move completes a four next move, read off the threat map
+        if depth > 0 and board.winning_moves(board.current_player):
+            return float('inf') if board.current_player == 2 else float('-inf')
+
+        # mirror positions share an entry on odd widths, so moves are stored
+        # mirrored too
+        key, mirrored = self.tt_key(board)
+        if is_maximizing:
+            key ^= MAXIMIZING_KEY
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            _, entry_depth, score, flag, tt_move = entry
+            if mirrored and tt_move is not None:
+                tt_move = board.cols - 1 - tt_move
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+
+        if depth == 0:
+            # for non-terminal states, evaluate normally
+            score = self.evaluate_leaf(board)
+            self.tt.store(key, 0, score, EXACT, None)
+            return score
+
+        moves = self.order_moves(board, tt_move)
+        if depth == 1:
+            return self.score_leaves(board, moves, is_maximizing, key, mirrored)
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
         if is_maximizing:
-            max_eval = float('-inf')
-            for col in board.get_valid_moves():
+            best_eval = float('-inf')
+            for col in moves:
                 board.make_move(col)
                 eval = self.minimax(board, depth - 1, False, alpha, beta)
                 board.undo_move(col)
-                max_eval = max(max_eval, eval)
+                if eval > best_eval or best_move is None:
+                    best_eval = eval
+                    best_move = col
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.record_cutoff(board, col, depth, col == moves[0])
                     break
-            return max_eval
         else:
-            min_eval = float('inf')
-            for col in board.get_valid_moves():
+            best_eval = float('inf')
+            for col in moves:
                 board.make_move(col)
                 eval = self.minimax(board, depth - 1, True, alpha, beta)
                 board.undo_move(col)
-                min_eval = min(min_eval, eval)
+                if eval < best_eval or best_move is None:
+                    best_eval = eval
+                    best_move = col
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.record_cutoff(board, col, depth, col == moves[0])
                     break
-            return min_eval 
\ No newline at end of file
+
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if mirrored:
+            best_move = board.cols - 1 - best_move
+        self.tt.store(key, depth, best_eval, flag, best_move)
+        return best_eval
+
+    def score_leaves(self, board, moves, is_maximizing, key, mirrored):
+        # all children are leaves, so score them in one batch instead of
+        # recursing into each of them
+        self.nodes += len(moves)
+        full = board.moves + 1 == board.rows * board.cols
+        best_eval = None
+        best_move = None
+        for col, score in zip(moves, self.evaluate_children(board, moves).tolist()):
+            if score >= WIN_SCORE // 2:
+                score = float('inf')  # ai wins
+            elif score <= -WIN_SCORE // 2:
+                score = float('-inf')  # player wins
+            elif full:
+                score = 0  # draw
+            if (best_eval is None or (score > best_eval if is_maximizing
+                                      else score < best_eval)):
+                best_eval = score
+                best_move = col
+
+        if mirrored:
+            best_move = board.cols - 1 - best_move
+        self.tt.store(key, 1, best_eval, EXACT, best_move)
+        return best_eval
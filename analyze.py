@@ -0,0 +1,157 @@
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import queue
+import sys
+import time
+
+from board import Board
+from ai_agent import Connect4AI
+from arena import parse_config, engine_view
+from evaluation import WIN_SCORE
+
+# the engine of a worker process, created once by _init_worker
+_engine = None
+
+def _init_worker(config):
+    global _engine
+    _engine = Connect4AI(**config)
+
+def parse_position(line, rows=6, cols=7, connect=4):
+    # A line is a column sequence played from the empty board, "3342" or
+    # "3,3,4,2" for boards wider than 10 columns, or a JSON object with
+    # "moves" (such a string or a list of columns) and optionally "id",
+    # "rows", "cols" and "connect". Returns (record, board).
+    line = line.strip()
+    record = {}
+    moves = line
+    if line.startswith('{'):
+        record = json.loads(line)
+        moves = record.get('moves', '')
+        rows = record.get('rows', rows)
+        cols = record.get('cols', cols)
+        connect = record.get('connect', connect)
+    if isinstance(moves, str):
+        moves = [int(col) for col in (moves.split(',') if ',' in moves else moves) if col.strip()]
+    board = Board(rows, cols, connect)
+    for col in moves:
+        if board.is_terminal() or not board.make_move(col):
+            raise ValueError(f"illegal move {col} after {board.moves} moves")
+    return record, board
+
+def analyze_board(board):
+    # engine output for the side to move, the engine always plays as player 2
+    # so player 1 to move is searched on a colour-swapped copy
+    _engine.new_game()  # results must not depend on earlier positions
+    move, stats = _engine.get_move(engine_view(board, board.current_player), return_stats=True)
+    score = stats.score
+    if score is not None and abs(score) == float('inf'):
+        score = WIN_SCORE if score > 0 else -WIN_SCORE
+    return {
+        'move': move,
+        'score': score,
+        'depth': stats.depth_reached,
+        'nodes': stats.nodes,
+        'time_ms': stats.wall_time * 1000,
+        'source': stats.source,
+    }
+
+def analyze_chunk(task):
+    # (chunk index, results) for one chunk of input lines
+    chunk_index, first, lines, rows, cols, connect = task
+    results = []
+    for index, line in enumerate(lines, first):
+        result = {'index': index}
+        try:
+            record, board = parse_position(line, rows, cols, connect)
+        except (ValueError, TypeError) as error:  # malformed JSON or moves
+            result['error'] = str(error)
+        else:
+            if 'id' in record:
+                result['id'] = record['id']
+            if board.is_terminal():
+                result['error'] = "game is over"
+            else:
+                try:
+                    result.update(analyze_board(board))
+                except Exception as error:  # e.g. a board the engine cannot play
+                    result['error'] = f"engine failed: {error}"
+        results.append(result)
+    return chunk_index, results
+
+def analyze_positions(lines, config, workers=None, ordered=True, chunk_size=16, window=None,
+                      rows=6, cols=7, connect=4):
+    # Yields one result per input line, in input order or as they finish.
+    # Lines are read lazily and at most `window` chunks are in the pool or
+    # waiting for an earlier chunk at any time, so memory stays flat however
+    # long the input is.
+    workers = workers or mp.cpu_count()
+    window = window or 4 * workers
+    lines = iter(lines)
+    chunks = iter(lambda: list(itertools.islice(lines, chunk_size)), [])
+    done = queue.Queue()
+    with mp.Pool(workers, _init_worker, (config,)) as pool:
+        submitted = finished = 0
+        waiting = {}  # finished chunks held back until the earlier ones finish
+        exhausted = False
+        while True:
+            while not exhausted and submitted - finished < window:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                task = (submitted, submitted * chunk_size, chunk, rows, cols, connect)
+                pool.apply_async(analyze_chunk, (task,), callback=done.put,
+                                 error_callback=done.put)
+                submitted += 1
+            if finished == submitted:
+                break
+            result = done.get()
+            if isinstance(result, Exception):
+                raise result
+            chunk_index, results = result
+            if not ordered:
+                finished += 1
+                yield from results
+                continue
+            waiting[chunk_index] = results
+            while finished in waiting:
+                yield from waiting.pop(finished)
+                finished += 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Annotate positions with Connect4AI output")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="file of move sequences or JSON lines, default stdin")
+    parser.add_argument('--output', help="JSONL output file, default stdout")
+    parser.add_argument('--engine', default='strategy=minimax,max_depth=6',
+                        help="Connect4AI settings, e.g. max_depth=8,time_limit_ms=100")
+    parser.add_argument('--workers', type=int, default=None, help="default: one per CPU")
+    parser.add_argument('--unordered', action='store_true',
+                        help="write results as they finish instead of in input order")
+    parser.add_argument('--chunk-size', type=int, default=16, help="positions per task")
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--connect', type=int, default=4)
+    parser.add_argument('--progress', type=int, default=1000,
+                        help="report progress every N positions, 0 turns it off")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    start = time.perf_counter()
+    count = errors = 0
+    for result in analyze_positions(source, parse_config(args.engine), args.workers,
+                                    not args.unordered, args.chunk_size,
+                                    rows=args.rows, cols=args.cols, connect=args.connect):
+        out.write(json.dumps(result) + '\n')
+        count += 1
+        errors += 'error' in result
+        if args.progress and count % args.progress == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{count} positions, {errors} errors, {count / elapsed:.1f} positions/sec",
+                  file=sys.stderr)
+    out.flush()
+    print(f"done: {count} positions, {errors} errors in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
@@ -0,0 +1,185 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import random
+import sys
+import time
+
+from board import Board
+from ai_agent import Connect4AI
+from game_log import GameLogWriter
+
+# engines cached per worker process, one per configuration, reset between games
+_engines = {}
+
+def parse_config(text):
+    # "strategy=minimax,max_depth=4,time_limit_ms=200" -> Connect4AI kwargs
+    config = {}
+    for item in filter(None, text.split(',')):
+        name, _, value = item.partition('=')
+        if value.lstrip('-').isdigit():
+            value = int(value)
+        elif value == 'None':
+            value = None
+        config[name.strip()] = value
+    return config
+
+def config_name(config):
+    return ','.join(f"{name}={value}" for name, value in sorted(config.items()))
+
+def engine_view(board, player):
+    # the engine always plays as player 2, so the engine playing as player 1
+    # gets a copy of the board with the colours swapped
+    if player == 2:
+        return board
+    view = Board(board.rows, board.cols, board.connect)
+    for _, col, piece, _ in board.history:
+        view.current_player = 3 - piece
+        view.make_move(col)
+    view.current_player = 2
+    return view
+
+def get_engine(config):
+    name = config_name(config)
+    if name not in _engines:
+        _engines[name] = Connect4AI(**config)
+    return _engines[name]
+
+def play_game(task):
+    # plays one game and returns its record, A moves first in even games
+    index, config_a, config_b, random_plies, seed, rows, cols, connect = task
+    rng = random.Random(seed * 1000003 + index // 2)  # both colours get the same opening
+    a_player = 1 if index % 2 == 0 else 2
+    engines = {a_player: get_engine(config_a), 3 - a_player: get_engine(config_b)}
+    for engine in engines.values():
+        engine.new_game()
+
+    board = Board(rows, cols, connect)
+    times = {1: [], 2: []}
+    for _ in range(random_plies):
+        if board.is_terminal():
+            break
+        board.make_move(rng.choice(board.get_valid_moves()))
+
+    while not board.is_terminal():
+        player = board.current_player
+        start = time.perf_counter()
+        move = engines[player].get_move(engine_view(board, player))
+        times[player].append(time.perf_counter() - start)
+        if move is None or not board.make_move(move):
+            break
+
+    winner = board.check_winner()
+    if winner in (None, 0):
+        result = 'draw'
+    else:
+        result = 'a' if winner == a_player else 'b'
+    return {
+        'game': index,
+        'a_player': a_player,
+        'result': result,
+        'moves': [col for _, col, _, _ in board.history],
+        'a_times': times[a_player],
+        'b_times': times[3 - a_player],
+    }
+
+def elo_difference(wins, draws, losses):
+    # Elo difference of A over B from the score fraction, with a 95% margin
+    games = wins + draws + losses
+    if not games:
+        return 0.0, 0.0
+    score = (wins + draws / 2) / games
+    score = min(max(score, 0.5 / games), 1 - 0.5 / games)  # avoid +-infinity
+    elo = -400 * math.log10(1 / score - 1)
+    deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+                           + losses * score ** 2) / games) / math.sqrt(games)
+    slope = 400 / (math.log(10) * score * (1 - score))
+    return elo, 1.96 * deviation * slope
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {}
+    values = sorted(values)
+    stats = {f"p{point}": values[min(len(values) - 1, int(len(values) * point / 100))]
+             for point in points}
+    stats['max'] = values[-1]
+    stats['mean'] = sum(values) / len(values)
+    return stats
+
+def run_arena(config_a, config_b, games=100, workers=None, output=None, random_plies=2,
+              seed=0, rows=6, cols=7, connect=4, progress=True, game_log=None):
+    # plays the games over a process pool, streaming each record to output
+    # and each game to the binary game_log as it finishes, and returns the
+    # summary
+    tasks = [(index, config_a, config_b, random_plies, seed, rows, cols, connect)
+             for index in range(games)]
+    counts = {'a': 0, 'draw': 0, 'b': 0}
+    a_times, b_times = [], []
+    out = open(output, 'w') if output else None
+    log = GameLogWriter(game_log, rows, cols, connect) if game_log else None
+    start = time.perf_counter()
+    with mp.Pool(workers) as pool:
+        for done, record in enumerate(pool.imap_unordered(play_game, tasks), 1):
+            counts[record['result']] += 1
+            a_times.extend(record['a_times'])
+            b_times.extend(record['b_times'])
+            if out:
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+            if log:
+                log.append(Board.from_moves(record['moves'], rows, cols, connect))
+                log.flush()
+            if progress and done % 10 == 0:
+                print(f"{done}/{games} games, A {counts['a']} D {counts['draw']} B {counts['b']}",
+                      file=sys.stderr)
+    if out:
+        out.close()
+    if log:
+        log.close()
+    elapsed = time.perf_counter() - start
+
+    elo, margin = elo_difference(counts['a'], counts['draw'], counts['b'])
+    return {
+        'a': config_name(config_a),
+        'b': config_name(config_b),
+        'games': games,
+        'wins': counts['a'],
+        'draws': counts['draw'],
+        'losses': counts['b'],
+        'elo': elo,
+        'elo_margin': margin,
+        'games_per_sec': games / elapsed,
+        'a_move_latency': percentiles(a_times),
+        'b_move_latency': percentiles(b_times),
+    }
+
+def print_summary(summary):
+    print(f"A: {summary['a']}")
+    print(f"B: {summary['b']}")
+    print(f"games {summary['games']}: A wins {summary['wins']}, draws {summary['draws']}, "
+          f"B wins {summary['losses']}")
+    print(f"Elo A - B: {summary['elo']:+.0f} +- {summary['elo_margin']:.0f}")
+    print(f"throughput: {summary['games_per_sec']:.2f} games/sec")
+    for side in ('a', 'b'):
+        latency = summary[f'{side}_move_latency']
+        if latency:
+            print(f"{side.upper()} move latency ms: " + ', '.join(
+                f"{name} {value * 1000:.1f}" for name, value in latency.items()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless self-play arena for Connect4AI")
+    parser.add_argument('--a', default='strategy=minimax,max_depth=4',
+                        help="Connect4AI settings of engine A, e.g. strategy=minimax,time_limit_ms=200")
+    parser.add_argument('--b', default='strategy=hill_climbing')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help="default: one per CPU")
+    parser.add_argument('--output', help="JSONL file that receives every game as it finishes")
+    parser.add_argument('--game-log', help="binary game log the games are appended to")
+    parser.add_argument('--random-plies', type=int, default=2,
+                        help="random opening moves so games differ")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    summary = run_arena(parse_config(args.a), parse_config(args.b), args.games, args.workers,
+                        args.output, args.random_plies, args.seed, game_log=args.game_log)
+    print_summary(summary)
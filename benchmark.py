@@ -0,0 +1,177 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from board import Board
+from board_batch import BoardBatch
+from ai_agent import Connect4AI
+from arena import percentiles
+
+# Fixed benchmark positions as column sequences played from the empty board,
+# player 1 moving first. Every position has player 2 (the AI) to move and is
+# quiet, neither side can win on the next move, so the searches measure real
+# positions rather than a one-move tactic and stay comparable over time.
+CORPUS = {
+    'opening': ['21536', '3154215', '345', '12452', '05661', '5356651', '16306', '533'],
+    'middlegame': ['356651416306253', '530621024641144030455', '424102260664464334106',
+                   '42665551125113055', '123561533651333', '0435420251542114554',
+                   '1250323324002036061', '414143146405600003505'],
+    'endgame': ['6256113564466560410012040054134', '164112516563501232552466105',
+                '20046032250514543621442246115', '2254601013441102106536445225255',
+                '313435644351021314325240211', '410656545066136555043331160',
+                '650360302232251353510655614', '16501223205151011544005252604'],
+}
+
+STRATEGIES = ('minimax', 'hill_climbing', 'simulated_annealing', 'mcts')
+
+def corpus_boards(phases=None):
+    for phase in phases or CORPUS:
+        for moves in CORPUS[phase]:
+            board = Board()
+            for col in moves:
+                board.make_move(int(col))
+            assert not board.winning_moves(1) and not board.winning_moves(2), moves
+            yield phase, board
+
+def bench_board(repeat):
+    # raw Board operations per second over every corpus position
+    boards = [board for _, board in corpus_boards()]
+    pairs = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            for col in board.get_valid_moves():
+                board.make_move(col)
+                board.undo_move(col)
+                pairs += 1
+    make_undo = pairs / (time.perf_counter() - start)
+
+    checks = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            for col in range(board.cols):
+                board.check_winner()
+                checks += 1
+    check_winner = checks / (time.perf_counter() - start)
+    return {'board.make_undo_per_sec': make_undo, 'board.check_winner_per_sec': check_winner}
+
+def bench_board_batch(steps, games=4096):
+    # random moves/sec stepping many games at once, finished games restart
+    batch = BoardBatch(games, auto_reset=True)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch.make_moves(batch.random_moves(rng))
+    return {'board_batch.moves_per_sec': steps * games / (time.perf_counter() - start)}
+
+def bench_minimax(depth):
+    # nodes/sec per phase at a fixed depth, the endgame solver is off so
+    # every phase measures the heuristic search
+    results = {}
+    for phase in CORPUS:
+        nodes = 0
+        elapsed = 0.0
+        for _, board in corpus_boards([phase]):
+            ai = Connect4AI(max_depth=depth, solver_threshold=None)
+            start = time.perf_counter()
+            ai.get_best_move_minimax(board)
+            elapsed += time.perf_counter() - start
+            nodes += ai.nodes
+        results[f'minimax.{phase}.nodes_per_sec'] = nodes / elapsed
+    return results
+
+def bench_time_to_depth(depth):
+    # mean seconds for a fresh search to finish each depth on the middlegames
+    results = {}
+    for target in range(1, depth + 1):
+        elapsed = 0.0
+        boards = [board for _, board in corpus_boards(['middlegame'])]
+        for board in boards:
+            ai = Connect4AI(max_depth=target, solver_threshold=None)
+            start = time.perf_counter()
+            ai.get_best_move_minimax(board)
+            elapsed += time.perf_counter() - start
+        results[f'minimax.time_to_depth.{target}'] = elapsed / len(boards)
+    return results
+
+def bench_latency(depth, repeat):
+    # get_move latency percentiles per strategy over the whole corpus
+    results = {}
+    for strategy in STRATEGIES:
+        times = []
+        for _ in range(repeat):
+            for _, board in corpus_boards():
+                ai = Connect4AI(max_depth=depth, strategy=strategy)
+                start = time.perf_counter()
+                ai.get_move(board)
+                times.append(time.perf_counter() - start)
+        for name, value in percentiles(times).items():
+            if name != 'max':  # too noisy to compare between runs
+                results[f'latency.{strategy}.{name}'] = value
+    return results
+
+def run_benchmarks(depth=6, repeat=3):
+    metrics = {}
+    metrics.update(bench_board(repeat * 100))
+    metrics.update(bench_board_batch(repeat * 100))
+    metrics.update(bench_minimax(depth))
+    metrics.update(bench_time_to_depth(depth))
+    metrics.update(bench_latency(depth, repeat))
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'depth': depth,
+        'metrics': metrics,
+    }
+
+def higher_is_better(name):
+    return name.endswith('_per_sec')
+
+def compare(old, new, threshold=10.0):
+    # (name, old, new, change %, regressed) for every metric in both runs,
+    # a change counts as a regression when it is worse by more than threshold %
+    rows = []
+    for name in sorted(set(old['metrics']) & set(new['metrics'])):
+        before, after = old['metrics'][name], new['metrics'][name]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if higher_is_better(name) else change
+        rows.append((name, before, after, change, worse > threshold))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect4 engine benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="run the benchmarks and save the results")
+    run.add_argument('--output', default='benchmark.json')
+    run.add_argument('--depth', type=int, default=6)
+    run.add_argument('--repeat', type=int, default=3)
+    diff = commands.add_parser('compare', help="compare two saved runs")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_benchmarks(args.depth, args.repeat)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        for name, value in results['metrics'].items():
+            print(f"{name:45s} {value:14.6g}")
+        print(f"saved to {args.output}")
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = 0
+        for name, before, after, change, regressed in compare(old, new, args.threshold):
+            regressions += regressed
+            flag = 'REGRESSION' if regressed else ''
+            print(f"{name:45s} {before:14.6g} {after:14.6g} {change:+8.1f}% {flag}")
+        sys.exit(1 if regressions else 0)
@@ -1,83 +1,403 @@
-import numpy as np
-
-class Board:
-    def __init__(self, rows=6, cols=7):
-        self.rows = rows
-        self.cols = cols
-        self.board = np.zeros((rows, cols), dtype=int)
-        self.current_player = 1  # Default to player 1
-        
-    def set_first_player(self, player):
-        # Set who moves first (1 for human, 2 for AI)
-        self.current_player = player
-    
-    def is_valid_move(self, col):
-        return 0 <= col < self.cols and self.board[0][col] == 0
-    
-    def make_move(self, col):
-        if not self.is_valid_move(col):
-            return False
-        
-        # Find the lowest empty row in the selected column
-        for row in range(self.rows - 1, -1, -1):
-            if self.board[row][col] == 0:
-                self.board[row][col] = self.current_player
-                self.current_player = 3 - self.current_player  # Switch between 1 and 2
-                return True
-        return False
-    
-    def undo_move(self, col):
-        for row in range(self.rows):
-            if self.board[row][col] != 0:
-                self.board[row][col] = 0
-                self.current_player = 3 - self.current_player
-                return True
-        return False
-    
-    def check_winner(self):
-        # Check horizontal
-        for row in range(self.rows):
-            for col in range(self.cols - 3):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row][col + 1] == 
-                    self.board[row][col + 2] == self.board[row][col + 3]):
-                    return self.board[row][col]
-        
-        # Check vertical
-        for row in range(self.rows - 3):
-            for col in range(self.cols):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row + 1][col] == 
-                    self.board[row + 2][col] == self.board[row + 3][col]):
-                    return self.board[row][col]
-        
-        # Check diagonal (+ve slope)
-        for row in range(3, self.rows):
-            for col in range(self.cols - 3):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row - 1][col + 1] == 
-                    self.board[row - 2][col + 2] == self.board[row - 3][col + 3]):
-                    return self.board[row][col]
-        
-        # Check diagonal (-ve slope)
-        for row in range(self.rows - 3):
-            for col in range(self.cols - 3):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row + 1][col + 1] == 
-                    self.board[row + 2][col + 2] == self.board[row + 3][col + 3]):
-                    return self.board[row][col]
-        
-        # Check for draw
-        if np.all(self.board != 0):
-            return 0
-        
-        return None
-    
-    def get_valid_moves(self):
-        return [col for col in range(self.cols) if self.is_valid_move(col)]
-    
-    def is_terminal(self):
-        return self.check_winner() is not None
-    
-    def get_state(self):
-        return self.board.copy() 
\ No newline at end of file
+import random
+import numpy as np
+
+ZOBRIST_SEED = 0x5EED
+_zobrist_tables = {}
+
+# boards with more cells than this take the sparse path: Zobrist keys are
+# hashed per cell instead of tabled and lines are tracked around the pieces
+# so evaluation never scans the whole board
+SPARSE_CELLS = 100
+MASK64 = (1 << 64) - 1
+
+def zobrist_table(rows, cols):
+    # fixed seed so keys match across boards and processes, one random
+    # 64-bit key per (player, col, row) plus one for "player 2 to move"
+    if (rows, cols) not in _zobrist_tables:
+        rng = random.Random(ZOBRIST_SEED)
+        keys = [[[rng.getrandbits(64) for _ in range(rows)] for _ in range(cols)]
+                for _ in range(2)]
+        _zobrist_tables[rows, cols] = (keys, rng.getrandbits(64))
+    return _zobrist_tables[rows, cols]
+
+def hashed_key(index):
+    # splitmix64 finalizer, a well mixed 64-bit key for any cell index
+    z = (index + ZOBRIST_SEED) * 0x9E3779B97F4A7C15 & MASK64
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+    return z ^ (z >> 31)
+
+class Board:
+    # Pieces are stored as bitboards: one integer per player plus an occupancy
+    # mask. Each column takes (rows + 1) bits, lowest bit is the bottom cell and
+    # the extra bit on top is a sentinel that stops shifts wrapping between
+    # columns. `connect` pieces in a line win.
+    def __init__(self, rows=6, cols=7, connect=4):
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.sparse = rows * cols > SPARSE_CELLS
+        self.current_player = 1  # Default to player 1
+        self.height = rows + 1
+        self.bitboards = [0, 0]  # pieces of player 1 and player 2
+        self.mask = 0  # all occupied cells
+        self.heights = [0] * cols  # pieces in each column
+        self.moves = 0
+        self.last_move = None  # (row, col, player) of the last piece placed
+        # one (row, col, player, winner) record per piece, winner is the
+        # result of the game after that move so terminal checks are free
+        self.history = []
+        self._grid = None  # cached numpy view, rebuilt on demand
+        # Zobrist hashes of the position and of its left-right mirror image,
+        # updated on every move
+        if self.sparse:
+            self.zobrist_keys, self.side_key = None, hashed_key(-1)
+        else:
+            self.zobrist_keys, self.side_key = zobrist_table(rows, cols)
+        self.zobrist = 0
+        self.mirror_zobrist = 0
+
+        # vertical, horizontal and both diagonals
+        self.directions = (1, self.height, self.height - 1, self.height + 1)
+        self.bottom_mask = sum(1 << (col * self.height) for col in range(cols))
+        self.board_mask = self.bottom_mask * ((1 << rows) - 1)  # every real cell
+
+        # threat maps: empty cells that would complete a line for player 1
+        # and player 2, updated on every move. Undo restores them from
+        # threat_history, which holds the previous maps or, on sparse
+        # boards, only the cells the move changed
+        self.threats = [0, 0]
+        self.threat_history = []
+
+        # sparse boards only: every line of `connect` cells holding a piece,
+        # keyed by its start cell and direction with the pieces of each
+        # player in it, and per player the number of lines with k own pieces
+        # and none of the opponent's. Memory grows with the pieces placed.
+        self.lines = {}
+        self.open_lines = [[0] * (connect + 1), [0] * (connect + 1)]
+        self.line_steps = ((1, 0), (0, 1), (1, 1), (1, -1))  # (dcol, drow)
+
+    @property
+    def board(self):
+        # numpy (rows, cols) view of the position, row 0 is the top row
+        if self._grid is None:
+            grid = np.zeros((self.rows, self.cols), dtype=int)
+            for row, col, player, _ in self.history:
+                grid[self.rows - 1 - row][col] = player
+            grid.flags.writeable = False
+            self._grid = grid
+        return self._grid
+
+    @classmethod
+    def from_moves(cls, moves, rows=6, cols=7, connect=4, first_player=1):
+        # board after playing `moves` (columns, or a string like "3342")
+        # from the empty board, raises ValueError on an illegal move
+        board = cls(rows, cols, connect)
+        player = first_player
+        for col in moves:
+            col = int(col)
+            if board.is_terminal() or not board.is_valid_move(col):
+                raise ValueError(f"illegal move {col} after {board.moves} moves")
+            board._place(col, player)
+            player = 3 - player
+        board.current_player = player
+        return board
+
+    @classmethod
+    def from_key(cls, key, rows=6, cols=7, connect=4):
+        # inverse of compact_key. The move order is lost, so history lists
+        # the pieces column by column from the bottom up.
+        board = cls(rows, cols, connect)
+        to_move = 2 if key >> (board.height * cols) & 1 else 1
+        column_mask = (1 << board.height) - 1
+        for col in range(cols):
+            bits = key >> (col * board.height) & column_mask
+            if not bits:
+                raise ValueError(f"{key:#x} is not a position key")
+            for row in range(bits.bit_length() - 1):  # the top set bit is the marker
+                board._place(col, to_move if bits >> row & 1 else 3 - to_move)
+        board.current_player = to_move
+        return board
+
+    def copy(self):
+        # independent board with the same pieces, history and player to move
+        board = Board(self.rows, self.cols, self.connect)
+        for _, col, player, _ in self.history:
+            board._place(col, player)
+        board.current_player = self.current_player
+        return board
+
+    def set_first_player(self, player):
+        # Set who moves first (1 for human, 2 for AI)
+        self.current_player = player
+
+    def is_valid_move(self, col):
+        return 0 <= col < self.cols and self.heights[col] < self.rows
+
+    def make_move(self, col):
+        if not self.is_valid_move(col):
+            return False
+
+        self._place(col, self.current_player)
+        self.current_player = 3 - self.current_player  # Switch between 1 and 2
+        return True
+
+    def undo_move(self, col):
+        if not 0 <= col < self.cols or not self.heights[col]:
+            return False
+
+        if self.last_move[1] == col:
+            self._remove_last()
+        else:
+            # the top piece of another column was placed earlier, so replay
+            # the remaining moves to keep the winner records exact
+            row = self.heights[col] - 1
+            records = [record for record in self.history if record[:2] != (row, col)]
+            while self.history:
+                self._remove_last()
+            for row, col, player, _ in records:
+                self._place(col, player)
+        self.current_player = 3 - self.current_player
+        return True
+
+    def _place(self, col, player):
+        row = self.heights[col]
+        bit = 1 << (col * self.height + row)
+        bits = self.bitboards[player - 1] | bit
+        self.bitboards[player - 1] = bits
+        self.mask |= bit
+        self.heights[col] = row + 1
+        self.moves += 1
+        key, mirror_key = self.cell_keys(player, col, row)
+        self.zobrist ^= key
+        self.mirror_zobrist ^= mirror_key
+        if self.sparse:
+            self.track_lines(col, row, player, 1)
+
+        # the new piece fills a cell of both maps and can only add cells to
+        # the mover's. Connect-4 boards rebuild the map with a few shifts,
+        # other boards walk the lines through the new piece
+        own, opp = self.threats[player - 1], self.threats[2 - player]
+        if self.sparse:
+            # whole maps are as large as the board, keep the indices of the
+            # cells this move adds and whether it filled a threat cell
+            cells = self.new_threats(bits, bit) & ~own
+            self.threats[player - 1] = own & ~bit | cells
+            added = []
+            while cells:
+                low = cells & -cells
+                added.append(low.bit_length() - 1)
+                cells ^= low
+            self.threat_history.append((bool(own & bit), bool(opp & bit), added))
+        else:
+            self.threat_history.append((own, opp))
+            if self.connect == 4:
+                self.threats[player - 1] = self.winning_cells(bits)
+            else:
+                self.threats[player - 1] = own & ~bit | self.new_threats(bits, bit)
+        self.threats[2 - player] = opp & ~bit
+
+        # a game that is already won stays won, otherwise only the lines
+        # through the new piece can have been completed
+        winner = self.history[-1][3] if self.history else None
+        if not winner and self.completes_line(bits, bit):
+            winner = player
+        elif winner is None and self.moves == self.rows * self.cols:
+            winner = 0
+        self.last_move = (row, col, player)
+        self.history.append((row, col, player, winner))
+        self._grid = None
+
+    def _remove_last(self):
+        row, col, player, _ = self.history.pop()
+        bit = 1 << (col * self.height + row)
+        self.bitboards[player - 1] ^= bit
+        self.mask ^= bit
+        self.heights[col] = row
+        self.moves -= 1
+        key, mirror_key = self.cell_keys(player, col, row)
+        self.zobrist ^= key
+        self.mirror_zobrist ^= mirror_key
+        if self.sparse:
+            self.track_lines(col, row, player, -1)
+            own_filled, opp_filled, added = self.threat_history.pop()
+            own = self.threats[player - 1]
+            for index in added:
+                own ^= 1 << index
+            self.threats[player - 1] = own | bit if own_filled else own
+            if opp_filled:
+                self.threats[2 - player] |= bit
+        else:
+            own, opp = self.threat_history.pop()
+            self.threats[player - 1], self.threats[2 - player] = own, opp
+        self.last_move = self.history[-1][:3] if self.history else None
+        self._grid = None
+
+    def cell_keys(self, player, col, row):
+        # Zobrist keys of a piece and of its mirror image
+        mirror_col = self.cols - 1 - col
+        if self.zobrist_keys is not None:
+            keys = self.zobrist_keys[player - 1]
+            return keys[col][row], keys[mirror_col][row]
+        base = (player - 1) * self.cols
+        return (hashed_key((base + col) * self.rows + row),
+                hashed_key((base + mirror_col) * self.rows + row))
+
+    def track_lines(self, col, row, player, sign):
+        # add (sign 1) or remove (sign -1) a piece from every line through it
+        own, opp = player - 1, 2 - player
+        open_own, open_opp = self.open_lines[own], self.open_lines[opp]
+        lines = self.lines
+        span = self.connect - 1
+        for direction, (dc, dr) in enumerate(self.line_steps):
+            # lines that fit on the board start first..last steps back
+            first, last = 0, span
+            for x, d, size in ((col, dc, self.cols), (row, dr, self.rows)):
+                if d > 0:
+                    first, last = max(first, span + 1 + x - size), min(last, x)
+                elif d < 0:
+                    first, last = max(first, span - x), min(last, size - 1 - x)
+            for i in range(first, last + 1):
+                key = ((col - i * dc) * self.rows + row - i * dr) * 4 + direction
+                counts = lines.get(key)
+                if counts is None:
+                    counts = lines[key] = [0, 0]
+                if sign < 0:
+                    counts[own] -= 1
+                mine, theirs = counts[own], counts[opp]
+                if not theirs:
+                    # open for player either way, move it between counters
+                    open_own[mine + 1] += sign
+                    if mine:
+                        open_own[mine] -= sign
+                elif not mine:
+                    # the piece closes (or reopens) a line of the opponent
+                    open_opp[theirs] -= sign
+                if sign > 0:
+                    counts[own] += 1
+                elif not counts[own] and not theirs:
+                    del lines[key]
+
+    def completes_line(self, bits, bit):
+        # count pieces along each line through bit, sentinel bits are never
+        # set so the walk stops at the board edge
+        for shift in self.directions:
+            count = 1
+            probe = bit >> shift
+            while probe & bits:
+                count += 1
+                probe >>= shift
+            probe = bit << shift
+            while probe & bits:
+                count += 1
+                probe <<= shift
+            if count >= self.connect:
+                return True
+        return False
+
+    def winning_cells(self, bits):
+        # every empty cell that completes a four with `bits`: three aligned
+        # pieces with the gap at either end or in the middle
+        cells = (bits << 1) & (bits << 2) & (bits << 3)  # vertical, gap on top
+        for shift in self.directions[1:]:
+            pair = (bits << shift) & (bits << 2 * shift)
+            cells |= pair & (bits << 3 * shift)
+            cells |= pair & (bits >> shift)
+            pair = (bits >> shift) & (bits >> 2 * shift)
+            cells |= pair & (bits << shift)
+            cells |= pair & (bits >> 3 * shift)
+        return cells & self.board_mask & ~self.mask
+
+    def new_threats(self, bits, bit):
+        # empty cells that complete a line with `bits` and lie on a line
+        # through the new piece `bit`. Such a cell has only own pieces
+        # between it and bit, so each walk ends at the first empty cell.
+        cells = 0
+        occupied = self.mask
+        for shift in self.directions:
+            probe = bit
+            while True:
+                probe <<= shift
+                if not probe & self.board_mask or probe & occupied & ~bits:
+                    break
+                if not probe & bits:
+                    if self.completes_line(bits | probe, probe):
+                        cells |= probe
+                    break
+            probe = bit
+            while True:
+                probe >>= shift
+                if not probe & self.board_mask or probe & occupied & ~bits:
+                    break
+                if not probe & bits:
+                    if self.completes_line(bits | probe, probe):
+                        cells |= probe
+                    break
+        return cells
+
+    def playable_cells(self):
+        # the lowest empty cell of every column that is not full
+        return (self.mask + self.bottom_mask) & self.board_mask
+
+    def winning_moves(self, player):
+        # columns where player completes a line right now
+        cells = self.threats[player - 1] & self.playable_cells()
+        moves = []
+        while cells:
+            low = cells & -cells
+            moves.append((low.bit_length() - 1) // self.height)
+            cells ^= low
+        return moves
+
+    def must_block(self, player):
+        # columns player has to play to stop the opponent winning next move
+        return self.winning_moves(3 - player)
+
+    def has_double_threat(self, player):
+        # two immediate wins at once, the opponent can block only one
+        cells = self.threats[player - 1] & self.playable_cells()
+        return cells & (cells - 1) != 0
+
+    def has_line(self, bits):
+        # shift-and trick: `connect` aligned pieces survive connect - 1 shifts
+        for shift in self.directions:
+            run = bits
+            for _ in range(self.connect - 1):
+                run &= run >> shift
+            if run:
+                return True
+        return False
+
+    def check_winner(self):
+        # cached when the last move was made
+        if self.history:
+            return self.history[-1][3]
+        return None
+
+    def get_valid_moves(self):
+        return [col for col in range(self.cols) if self.heights[col] < self.rows]
+
+    def is_terminal(self):
+        return bool(self.history) and self.history[-1][3] is not None
+
+    def position_key(self, mirror=True):
+        # a position and its mirror image share one key, the flag tells
+        # whether columns have to be mirrored to match the stored orientation.
+        # mirror=False keys every position on its own
+        side = self.side_key if self.current_player == 2 else 0
+        if mirror and self.mirror_zobrist < self.zobrist:
+            return self.mirror_zobrist ^ side, True
+        return self.zobrist ^ side, False
+
+    def compact_key(self):
+        # The exact position as one integer, see from_key. The pieces of the
+        # player to move plus mask + bottom_mask, which sets the cell above
+        # the top piece of every column, and one bit past the last column
+        # when player 2 is to move. 50 bits on the standard board.
+        key = self.bitboards[self.current_player - 1] + self.mask + self.bottom_mask
+        if self.current_player == 2:
+            key |= 1 << (self.height * self.cols)
+        return key
+
+    def get_state(self):
+        return self.board.copy()
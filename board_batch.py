@@ -0,0 +1,194 @@
+import copy
+
+import numpy as np
+
+from board import Board
+
+RUNNING = -1  # winner of a game that is not over
+ILLEGAL = -2  # make_moves result of a game whose move was refused
+
+def fits(rows, cols):
+    # whether BoardBatch can hold games of this size
+    return (rows + 1) * cols < 64
+
+class BoardBatch:
+    # N games stepped together with numpy. Each game is a pair of uint64
+    # bitboards in Board's layout: the pieces of the player to move and the
+    # occupancy mask, so a move for every game is a handful of array
+    # operations and no Python loop runs per game. The board, plus the
+    # side-to-move bit of compact_key, has to fit 64 bits, which includes
+    # the standard 6x7.
+    def __init__(self, n, rows=6, cols=7, connect=4, first_player=1, auto_reset=False):
+        height = rows + 1
+        if not fits(rows, cols):
+            raise ValueError(f"a {rows}x{cols} board does not fit 64-bit batch bitboards")
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.first_player = first_player
+        # finished games start over right after the move that ended them
+        self.auto_reset = auto_reset
+
+        self.height = height
+        self.col_bottom = np.array([1 << (col * height) for col in range(cols)], dtype=np.uint64)
+        self.col_top = self.col_bottom << np.uint64(rows - 1)
+        self.col_mask = self.col_bottom * np.uint64((1 << rows) - 1)
+        self.bottom_mask = np.uint64(sum(1 << (col * height) for col in range(cols)))
+        self.full = self.bottom_mask * np.uint64((1 << rows) - 1)
+        self.side_bit = np.uint64(1 << (height * cols))
+        self.shifts = [np.uint64(shift) for shift in (1, height, height - 1, height + 1)]
+
+        self.position = np.zeros(n, dtype=np.uint64)  # pieces of the player to move
+        self.mask = np.zeros(n, dtype=np.uint64)
+        self.current_player = np.full(n, first_player, dtype=np.int8)
+        self.moves = np.zeros(n, dtype=np.int16)
+        self.winners = np.full(n, RUNNING, dtype=np.int8)
+
+    @classmethod
+    def from_boards(cls, boards, auto_reset=False):
+        # batch holding a copy of every Board, all of the same shape
+        first = boards[0]
+        batch = cls(len(boards), first.rows, first.cols, first.connect, auto_reset=auto_reset)
+        batch.position[:] = [board.bitboards[board.current_player - 1] for board in boards]
+        batch.mask[:] = [board.mask for board in boards]
+        batch.current_player[:] = [board.current_player for board in boards]
+        batch.moves[:] = [board.moves for board in boards]
+        winners = [board.check_winner() for board in boards]
+        batch.winners[:] = [RUNNING if winner is None else winner for winner in winners]
+        return batch
+
+    def __len__(self):
+        return len(self.position)
+
+    def take(self, index):
+        # new batch of the games at index, which may repeat games
+        batch = copy.copy(self)  # shares the board constants
+        batch.position = self.position[index]
+        batch.mask = self.mask[index]
+        batch.current_player = self.current_player[index]
+        batch.moves = self.moves[index]
+        batch.winners = self.winners[index]
+        return batch
+
+    def reset(self, games=None):
+        # empty boards for the games selected by index or boolean mask, all by default
+        games = slice(None) if games is None else games
+        self.position[games] = 0
+        self.mask[games] = 0
+        self.current_player[games] = self.first_player
+        self.moves[games] = 0
+        self.winners[games] = RUNNING
+
+    def valid_move_mask(self):
+        # (N, cols) bool, no moves are valid in finished games
+        valid = (self.mask[:, np.newaxis] & self.col_top) == 0
+        valid &= (self.winners == RUNNING)[:, np.newaxis]
+        return valid
+
+    def has_line(self, bits):
+        # `connect` aligned pieces survive connect - 1 shift-ands
+        found = np.zeros(len(bits), dtype=bool)
+        for shift in self.shifts:
+            run = bits
+            for _ in range(self.connect - 1):
+                run = run & (run >> shift)
+            found |= run != 0
+        return found
+
+    def make_moves(self, cols):
+        # Plays cols[i] in game i. Returns per game the winner when the move
+        # ended it (0 for a draw), RUNNING when it did not and ILLEGAL when the
+        # column is full, out of range or the game was already over, leaving
+        # that game unchanged. With auto_reset the games that ended are
+        # reset afterwards, so read their results from the return value.
+        cols = np.asarray(cols)
+        in_range = (cols >= 0) & (cols < self.cols)
+        cols = np.where(in_range, cols, 0)
+        legal = in_range & (self.winners == RUNNING) & ((self.mask & self.col_top[cols]) == 0)
+
+        move = (self.mask + self.col_bottom[cols]) & self.col_mask[cols]
+        move[~legal] = 0
+        mine = self.position | move
+        won = legal & self.has_line(mine)
+        self.mask |= move
+        # the opponent's pieces become the pieces of the player to move
+        self.position = np.where(legal, mine ^ self.mask, self.position)
+        mover = self.current_player.copy()
+        self.current_player = np.where(legal, 3 - mover, mover).astype(np.int8)
+        self.moves += legal
+
+        results = np.where(legal, RUNNING, ILLEGAL).astype(np.int8)
+        results[legal & (self.mask == self.full)] = 0
+        results[won] = mover[won]
+        ended = results >= 0
+        self.winners[ended] = results[ended]
+        if self.auto_reset and ended.any():
+            self.reset(ended)
+        return results
+
+    def check_winners(self):
+        # winner of every game, 0 for a draw and RUNNING while it goes on
+        return self.winners.copy()
+
+    def random_moves(self, rng):
+        # a uniformly random valid column per game, 0 for finished games
+        valid = self.valid_move_mask()
+        pick = rng.random(valid.shape)
+        pick[~valid] = -1.0
+        return pick.argmax(axis=1)
+
+    def playout(self, rng):
+        # Plays every running game to the end with random moves and returns
+        # all winners. The games still running are kept in local arrays that
+        # shrink as games end, and as every move is legal the steps skip the
+        # checks of make_moves.
+        index = np.flatnonzero(self.winners == RUNNING)
+        position, mask = self.position[index], self.mask[index]
+        to_move, moves = self.current_player[index], self.moves[index]
+        while len(index):
+            valid = (mask[:, np.newaxis] & self.col_top) == 0
+            pick = rng.random(valid.shape)
+            pick[~valid] = -1.0
+            cols = pick.argmax(axis=1)
+            move = (mask + self.col_bottom[cols]) & self.col_mask[cols]
+            won = self.has_line(position | move)
+            position = position ^ mask  # the opponent's pieces
+            mask = mask | move
+            to_move = 3 - to_move
+            moves = moves + 1
+            ended = won | (mask == self.full)
+            if ended.any():
+                finished = index[ended]
+                self.position[finished] = position[ended]
+                self.mask[finished] = mask[ended]
+                self.current_player[finished] = to_move[ended]
+                self.moves[finished] = moves[ended]
+                self.winners[finished] = np.where(won[ended], 3 - to_move[ended], 0)
+                running = ~ended
+                index, position, mask = index[running], position[running], mask[running]
+                to_move, moves = to_move[running], moves[running]
+        return self.winners.copy()
+
+    def bitboards(self):
+        # (pieces of player 1, pieces of player 2)
+        other = self.position ^ self.mask
+        first = self.current_player == 1
+        return np.where(first, self.position, other), np.where(first, other, self.position)
+
+    def keys(self):
+        # Board.compact_key of every game as uint64
+        keys = self.position + self.mask + self.bottom_mask
+        return np.where(self.current_player == 2, keys | self.side_bit, keys)
+
+    def board(self, i):
+        # game i as a Board, its history lists the pieces column by column
+        return Board.from_key(int(self.keys()[i]), self.rows, self.cols, self.connect)
+
+    def grids(self):
+        # (N, rows, cols) int8 grids like Board.board, row 0 is the top row
+        rows = np.arange(self.rows - 1, -1, -1)[:, np.newaxis]
+        shifts = (np.arange(self.cols) * self.height + rows).astype(np.uint64)
+        first, second = self.bitboards()
+        grids = ((first[:, np.newaxis, np.newaxis] >> shifts) & np.uint64(1)).astype(np.int8)
+        grids += 2 * ((second[:, np.newaxis, np.newaxis] >> shifts) & np.uint64(1)).astype(np.int8)
+        return grids
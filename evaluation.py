@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# heuristic weights, scores are from the point of view of `player`
+CENTER_WEIGHT = 3   # own pieces in the center column
+TWO_WEIGHT = 2      # window with two own pieces and two empty cells
+THREE_WEIGHT = 5    # open three: three own pieces and one empty cell
+THREAT_WEIGHT = 100  # open three whose empty cell can be played right now
+BLOCK_WEIGHT = 80   # same for the opponent, they have to be blocked
+WIN_SCORE = 1000000
+# a playable three of the side to move wins on its next move, which
+# outweighs every other term but stays below the scores of finished games
+MOVE_WIN_SCORE = WIN_SCORE // 4
+
+_windows = {}
+
+def window_indices(rows, cols, connect=4):
+    # flat cell indices of every line of `connect` cells on the board,
+    # 69 windows of 4 on the standard 6x7 board
+    if (rows, cols, connect) not in _windows:
+        windows = []
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for row in range(rows):
+                for col in range(cols):
+                    end_row = row + dr * (connect - 1)
+                    end_col = col + dc * (connect - 1)
+                    if 0 <= end_row < rows and 0 <= end_col < cols:
+                        windows.append([(row + dr * i) * cols + col + dc * i
+                                        for i in range(connect)])
+        _windows[rows, cols, connect] = np.array(windows, dtype=np.intp).reshape(-1, connect)
+    return _windows[rows, cols, connect]
+
+def evaluate_boards(boards, player=2, connect=4, to_move=None):
+    # score one (rows, cols) grid or a stack of grids (N, rows, cols) in a
+    # handful of array operations over all windows at once. to_move is the
+    # side to move in every grid, None leaves it out of the score
+    boards = np.asarray(boards)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[np.newaxis]
+    n, rows, cols = boards.shape
+    opponent = 3 - player
+    windows = window_indices(rows, cols, connect)
+
+    flat = boards.reshape(n, rows * cols)
+    cells = flat[:, windows]  # (N, windows, connect)
+    own = (cells == player).sum(axis=2)
+    opp = (cells == opponent).sum(axis=2)
+    empty = connect - own - opp
+
+    # a cell is playable when it is empty and rests on a piece or the floor,
+    # row 0 is the top row
+    occupied = flat != 0
+    supported = np.ones_like(occupied)
+    supported[:, :(rows - 1) * cols] = occupied[:, cols:]
+    playable = ~occupied & supported
+
+    # index of the first empty cell of each window (only used when empty == 1)
+    gap = windows[np.arange(len(windows)), (cells == 0).argmax(axis=2)]
+    gap_playable = np.take_along_axis(playable, gap, axis=1)
+
+    own_three = (own == connect - 1) & (empty == 1)
+    opp_three = (opp == connect - 1) & (empty == 1)
+
+    score = CENTER_WEIGHT * (boards[:, :, cols // 2] == player).sum(axis=1)
+    score += TWO_WEIGHT * ((own == connect - 2) & (empty == 2)).sum(axis=1)
+    score -= TWO_WEIGHT * ((opp == connect - 2) & (empty == 2)).sum(axis=1)
+    score += THREE_WEIGHT * own_three.sum(axis=1)
+    score -= THREE_WEIGHT * opp_three.sum(axis=1)
+    own_threats = (own_three & gap_playable).sum(axis=1)
+    opp_threats = (opp_three & gap_playable).sum(axis=1)
+    score += THREAT_WEIGHT * own_threats
+    score -= BLOCK_WEIGHT * opp_threats
+    if to_move == player:
+        score += MOVE_WIN_SCORE * (own_threats > 0)
+    elif to_move == opponent:
+        score -= MOVE_WIN_SCORE * (opp_threats > 0)
+    score += WIN_SCORE * (own == connect).any(axis=1)
+    score -= WIN_SCORE * (opp == connect).any(axis=1)
+
+    if single:
+        return int(score[0])
+    return score
+
+class EvaluationCache:
+    # Bounded LRU of evaluator scores keyed by position. Get and put tolerate
+    # a second thread (the pondering engine) working on the same cache.
+    def __init__(self, size=100000):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:  # evicted by the other thread meanwhile
+            pass
+        return score
+
+    def put(self, key, score):
+        self.entries[key] = score
+        if len(self.entries) > self.size:
+            try:
+                self.entries.popitem(last=False)
+            except KeyError:
+                pass
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+def evaluate_lines(board, player=2):
+    # the same terms for a sparse Board, read off the line counters and
+    # threat maps it keeps up to date, so the cost does not grow with the
+    # board. Threats count playable cells instead of windows.
+    connect = board.connect
+    own, opp = board.open_lines[player - 1], board.open_lines[2 - player]
+    playable = board.playable_cells()
+    center = ((1 << board.rows) - 1) << (board.cols // 2 * board.height)
+
+    score = CENTER_WEIGHT * bin(board.bitboards[player - 1] & center).count('1')
+    if connect > 2:
+        score += TWO_WEIGHT * (own[connect - 2] - opp[connect - 2])
+    score += THREE_WEIGHT * (own[connect - 1] - opp[connect - 1])
+    own_threats = bin(board.threats[player - 1] & playable).count('1')
+    opp_threats = bin(board.threats[2 - player] & playable).count('1')
+    score += THREAT_WEIGHT * own_threats
+    score -= BLOCK_WEIGHT * opp_threats
+    if board.current_player == player and own_threats:
+        score += MOVE_WIN_SCORE
+    elif board.current_player != player and opp_threats:
+        score -= MOVE_WIN_SCORE
+    winner = board.check_winner()
+    if winner == player:
+        score += WIN_SCORE
+    elif winner == 3 - player:
+        score -= WIN_SCORE
+    return score
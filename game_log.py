@@ -0,0 +1,155 @@
+import argparse
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from board import Board
+
+# Append-only file of finished games. A header, then fixed-size records:
+# the compact key of the final position (Board.compact_key), the result,
+# the player who moved first, the number of moves and the moves packed two
+# per byte, low nibble first. Fixed-size records let the reader view the
+# whole file as one numpy array without decoding anything.
+MAGIC = b'C4GL'
+VERSION = 2
+HEADER = struct.Struct('<4sBBBB')  # magic, version, rows, cols, connect
+UNFINISHED = 255  # result of a game that stopped before it was decided
+
+def moves_bytes(rows, cols):
+    return (rows * cols + 1) // 2
+
+def record_struct(rows, cols):
+    # key, result, first player, move count, packed moves
+    return struct.Struct(f'<QBBB{moves_bytes(rows, cols)}s')
+
+def record_dtype(rows, cols):
+    # the same layout as record_struct for numpy, 32 bytes on the standard board
+    return np.dtype([('key', '<u8'), ('result', 'u1'), ('first_player', 'u1'),
+                     ('length', 'u1'), ('moves', 'u1', (moves_bytes(rows, cols),))])
+
+def pack_moves(moves):
+    # columns 0-15 packed two per byte
+    packed = bytearray((len(moves) + 1) // 2)
+    for i, col in enumerate(moves):
+        packed[i // 2] |= col << (i % 2 * 4)
+    return bytes(packed)
+
+def unpack_moves(packed, length):
+    return [packed[i // 2] >> (i % 2 * 4) & 15 for i in range(length)]
+
+class GameLogWriter:
+    # Appends games to a log, creating it when missing. A record only
+    # counts once it is completely written, a torn record left by a crash is
+    # cut off when the log is opened again.
+    def __init__(self, path, rows=6, cols=7, connect=4):
+        if (rows + 1) * cols + 1 > 64 or cols > 16:
+            raise ValueError(f"a {rows}x{cols} board does not fit the log's 64-bit keys")
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.record = record_struct(rows, cols)
+        self.file = open(path, 'ab')
+        size = self.file.tell()
+        if size == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, rows, cols, connect))
+        else:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER.size)
+            if (len(header) < HEADER.size
+                    or HEADER.unpack(header) != (MAGIC, VERSION, rows, cols, connect)):
+                self.file.close()
+                raise ValueError(f"{path} is not a game log of {rows}x{cols} connect {connect}")
+            torn = (size - HEADER.size) % self.record.size
+            if torn:
+                self.file.truncate(size - torn)
+
+    def append(self, board):
+        # log the game played on board, from its history
+        if (board.rows, board.cols, board.connect) != (self.rows, self.cols, self.connect):
+            raise ValueError(f"log holds {self.rows}x{self.cols} connect {self.connect} games")
+        moves = [col for _, col, _, _ in board.history]
+        first_player = board.history[0][2] if board.history else board.current_player
+        result = board.check_winner()
+        self.file.write(self.record.pack(board.compact_key(),
+                                         UNFINISHED if result is None else result,
+                                         first_player, len(moves), pack_moves(moves)))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class GameLogReader:
+    # Maps the log on first use and exposes the records as a read-only numpy
+    # structured array over the map, so scans such as
+    # `(log.records['result'] == 1).sum()` never build Python objects. Records
+    # appended after the log was opened are not seen.
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self._records = None
+        self.rows = self.cols = self.connect = None
+
+    def open(self):
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.connect = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a game log")
+        if version != VERSION:
+            raise ValueError(f"{self.path} is a version {version} game log, not {VERSION}")
+        dtype = record_dtype(self.rows, self.cols)
+        count = (len(self.map) - HEADER.size) // dtype.itemsize  # ignores a torn record
+        self._records = np.frombuffer(self.map, dtype, count, HEADER.size)
+
+    def close(self):
+        # records still referenced elsewhere keep the map open, mmap raises
+        # BufferError then
+        if self.map is not None:
+            self._records = None
+            self.map.close()
+            self.map = None
+
+    @property
+    def records(self):
+        if self.map is None:
+            self.open()
+        return self._records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        # one numpy record at a time, fields are read straight from the map
+        return iter(self.records)
+
+    def moves(self, index):
+        record = self.records[index]
+        return unpack_moves(record['moves'].tobytes(), int(record['length']))
+
+    def board(self, index):
+        # replay a logged game
+        record = self.records[index]
+        return Board.from_moves(self.moves(index), self.rows, self.cols, self.connect,
+                                first_player=int(record['first_player']))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a binary game log")
+    parser.add_argument('path')
+    parser.add_argument('--show', type=int, default=0, help="print the moves of the first N games")
+    args = parser.parse_args()
+    log = GameLogReader(args.path)
+    records = log.records
+    results = np.bincount(records['result'], minlength=UNFINISHED + 1)
+    print(f"{len(log)} games of {log.rows}x{log.cols} connect {log.connect} "
+          f"in {os.path.getsize(args.path)} bytes")
+    print(f"player 1 wins {results[1]}, player 2 wins {results[2]}, draws {results[0]}, "
+          f"unfinished {results[UNFINISHED]}")
+    if len(log):
+        print(f"mean length {records['length'].mean():.1f} moves")
+    for index in range(min(args.show, len(log))):
+        print(''.join(f"{col:x}" for col in log.moves(index)))
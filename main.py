@@ -1,11 +1,10 @@
 import pygame
 import sys
+import os
+import threading
 from board import Board
 from ai_agent import Connect4AI
 
-# Initialize Pygame
-pygame.init()
-
 # Constants
 WINDOW_SIZE = 800
 BOARD_ROWS = 6
@@ -14,6 +13,8 @@ SQUARE_SIZE = WINDOW_SIZE // BOARD_COLS
 BOARD_HEIGHT = SQUARE_SIZE * BOARD_ROWS
 PADDING = 50  # Increased padding for text area
 TEXT_AREA_HEIGHT = 60  # Fixed height for text area
+BOOK_PATH = 'opening_book.bin'  # built with opening_book.py, used by Hard if present
+HARD_TIME_LIMIT_MS = 1000  # per-move search budget of Hard
 
 # Colors
 BLACK = (0, 0, 0)
@@ -22,106 +23,196 @@ RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 DGrey = (100, 100, 100)
 
-# Set up the display
-screen = pygame.display.set_mode((WINDOW_SIZE, BOARD_HEIGHT + TEXT_AREA_HEIGHT))
-pygame.display.set_caption("Connect4")
+# The display is opened by init_display when the game starts, so importing
+# this module does not initialize pygame or open a window
+screen = None
+clock = None
+renderer = None
 
-def draw_board(board, game_over=False, winner=None, difficulty='medium', ai_first=False):
-    # Clear the entire screen with Dark Grey
-    screen.fill(DGrey)
-    
-    # Draw the board background
-    pygame.draw.rect(screen, DGrey, (0, 0, WINDOW_SIZE, BOARD_HEIGHT))
-    
-    # Draw the pieces area background
-    for row in range(BOARD_ROWS):
-        for col in range(BOARD_COLS):
-            pygame.draw.circle(screen, WHITE,
-                             (col * SQUARE_SIZE + SQUARE_SIZE // 2,
-                              row * SQUARE_SIZE + SQUARE_SIZE // 2),
-                             SQUARE_SIZE // 2 - 5)
-    
-    # Draw the pieces
-    for row in range(BOARD_ROWS):
-        for col in range(BOARD_COLS):
-            if board.board[row][col] != 0:
-                color = YELLOW if board.board[row][col] == 2 else RED  # AI is yellow, player is red
-                pygame.draw.circle(screen, color,
-                                 (col * SQUARE_SIZE + SQUARE_SIZE // 2,
-                                  row * SQUARE_SIZE + SQUARE_SIZE // 2),
-                                 SQUARE_SIZE // 2 - 5)
-    
-    # Draw game over message if game is over
-    if game_over and winner is not None:
-        font = pygame.font.Font(None, 74)
+AI_DONE = pygame.USEREVENT  # posted by AIWorker when its move is ready
+THINKING_REDRAW_MS = 100  # how often the thinking indicator is animated
+# the window content was lost and has to be repainted
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, getattr(pygame, 'WINDOWEXPOSED', pygame.VIDEOEXPOSE))
+
+class AIWorker:
+    # Runs ai.get_move on a copy of the board in a background thread so the
+    # event loop keeps running while the AI thinks
+    def __init__(self, ai, board):
+        self.ai = ai
+        self.move = None
+        self.done = False
+        self.cancel_event = threading.Event()
+        ai.cancel_event = self.cancel_event
+        self.thread = threading.Thread(target=self.run, args=(board.copy(),), daemon=True)
+        self.thread.start()
+
+    def run(self, board):
+        self.move = self.ai.get_move(board)
+        self.done = True
+        pygame.event.post(pygame.event.Event(AI_DONE))  # wake up the event loop
+
+    def cancel(self):
+        # stop the search and wait for the thread, its move is dropped
+        self.cancel_event.set()
+        self.thread.join()
+
+class Renderer:
+    # Draws the game only when something changed. The board and pieces are
+    # pre-rendered, fonts and text surfaces are cached, and after the first
+    # full frame only the cells and status bar that changed are updated.
+    def __init__(self, screen):
+        self.screen = screen
+        self.fonts = {}
+        self.texts = {}
+        self.radius = SQUARE_SIZE // 2 - 5
+
+        # board background with an empty hole in every cell
+        self.background = pygame.Surface((WINDOW_SIZE, BOARD_HEIGHT))
+        self.background.fill(DGrey)
+        for row in range(BOARD_ROWS):
+            for col in range(BOARD_COLS):
+                pygame.draw.circle(self.background, WHITE, self.cell_center(row, col), self.radius)
+
+        # one sprite per piece colour, drawn over the cell it occupies
+        self.pieces = {}
+        for player, color in ((1, RED), (2, YELLOW)):  # AI is yellow, player is red
+            sprite = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
+            sprite.fill(DGrey)
+            pygame.draw.circle(sprite, color, (SQUARE_SIZE // 2, SQUARE_SIZE // 2), self.radius)
+            self.pieces[player] = sprite
+
+        # semi-transparent overlay for the game over message
+        self.overlay = pygame.Surface((WINDOW_SIZE, BOARD_HEIGHT))
+        self.overlay.set_alpha(128)
+        self.overlay.fill(BLACK)
+
+        self.invalidate()
+
+    def invalidate(self):
+        # forget what is on screen so the next draw repaints everything,
+        # e.g. after the window was covered or another screen was shown
+        self.grid = None
+        self.frame = None
+        self.status = None
+
+    def cell_center(self, row, col):
+        return (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2)
+
+    def text(self, text, size):
+        # rendered text surfaces are cached, the status line has few variants
+        if (text, size) not in self.texts:
+            if size not in self.fonts:
+                self.fonts[size] = pygame.font.Font(None, size)
+            self.texts[text, size] = self.fonts[size].render(text, True, WHITE)
+        return self.texts[text, size]
+
+    def draw_board(self, board, game_over=False, winner=None, difficulty='medium', ai_first=False,
+                   thinking=False):
+        if thinking:
+            dots = '.' * (pygame.time.get_ticks() // 400 % 4)
+            status_text = f"AI is thinking{dots}"
+        elif not game_over:
+            status_text = f"Difficulty: {difficulty} ({'AI' if ai_first else 'Human'} moves first)"
+        else:
+            status_text = "Press R to restart"
+        frame = ('board', game_over and winner is not None, winner)
+        grid = board.board
+
+        # the overlay covers the whole board, so it needs a full repaint
+        if frame != self.frame or self.grid is None:
+            self.screen.blit(self.background, (0, 0))
+            for row, col in zip(*grid.nonzero()):
+                self.draw_piece(row, col, grid[row][col])
+            if frame[1]:
+                self.draw_game_over(winner)
+            self.draw_status(status_text)
+            pygame.display.flip()
+        else:
+            dirty = []
+            for row, col in zip(*(grid != self.grid).nonzero()):
+                dirty.append(self.draw_piece(row, col, grid[row][col]))
+            if status_text != self.status:
+                dirty.append(self.draw_status(status_text))
+            if dirty:
+                pygame.display.update(dirty)
+        self.frame = frame
+        self.grid = grid
+        self.status = status_text
+
+    def draw_piece(self, row, col, player):
+        rect = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+        if player:
+            self.screen.blit(self.pieces[player], rect)
+        else:
+            self.screen.blit(self.background, rect, rect)
+        return rect
+
+    def draw_game_over(self, winner):
         if winner == 0:
-            text = font.render('Draw!', True, WHITE)
+            text = self.text('Draw!', 74)
         else:
-            text = font.render(f'{"AI" if winner == 2 else "Player"} Wins!', True, WHITE)
+            text = self.text(f'{"AI" if winner == 2 else "Player"} Wins!', 74)
         text_rect = text.get_rect(center=(WINDOW_SIZE // 2, BOARD_HEIGHT // 2))
-        # Draw semi-transparent overlay
-        s = pygame.Surface((WINDOW_SIZE, BOARD_HEIGHT))
-        s.set_alpha(128)
-        s.fill(BLACK)
-        screen.blit(s, (0,0))
-        screen.blit(text, text_rect)
-    
-    # Draw the text area background
-    pygame.draw.rect(screen, BLACK, (0, BOARD_HEIGHT, WINDOW_SIZE, TEXT_AREA_HEIGHT))
-    
-    # Draw the status text
-    font = pygame.font.Font(None, 36)
-    if not game_over:
-        status_text = f"Difficulty: {difficulty} ({'AI' if ai_first else 'Human'} moves first)"
-    else:
-        status_text = "Press R to restart"
-    text = font.render(status_text, True, WHITE)
-    text_rect = text.get_rect(center=(WINDOW_SIZE // 2, BOARD_HEIGHT + TEXT_AREA_HEIGHT // 2))
-    screen.blit(text, text_rect)
-    
-    pygame.display.flip()
+        self.screen.blit(self.overlay, (0, 0))
+        self.screen.blit(text, text_rect)
+
+    def draw_status(self, status_text):
+        # Draw the text area background and the status text
+        rect = pygame.Rect(0, BOARD_HEIGHT, WINDOW_SIZE, TEXT_AREA_HEIGHT)
+        pygame.draw.rect(self.screen, BLACK, rect)
+        text = self.text(status_text, 36)
+        text_rect = text.get_rect(center=(WINDOW_SIZE // 2, BOARD_HEIGHT + TEXT_AREA_HEIGHT // 2))
+        self.screen.blit(text, text_rect)
+        return rect
+
+    def draw_menu(self, title, instructions):
+        if self.frame == ('menu', title):
+            return
+        self.screen.fill(DGrey)
+        title_text = self.text(title, 74)
+        self.screen.blit(title_text, title_text.get_rect(center=(WINDOW_SIZE // 2, WINDOW_SIZE // 4)))
+        instructions_text = self.text(instructions, 48)
+        self.screen.blit(instructions_text,
+                         instructions_text.get_rect(center=(WINDOW_SIZE // 2, WINDOW_SIZE // 2)))
+        pygame.display.flip()
+        self.invalidate()
+        self.frame = ('menu', title)
+
+def init_display():
+    global screen, clock, renderer
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_SIZE, BOARD_HEIGHT + TEXT_AREA_HEIGHT))
+    pygame.display.set_caption("Connect4")
+    clock = pygame.time.Clock()
+    renderer = Renderer(screen)
+
+def draw_board(board, game_over=False, winner=None, difficulty='medium', ai_first=False, thinking=False):
+    renderer.draw_board(board, game_over, winner, difficulty, ai_first, thinking)
 
 def draw_difficulty_menu(screen):
-    # Clear the screen
-    screen.fill(DGrey)
-    
-    # Draw title
-    font = pygame.font.Font(None, 74)
-    title = font.render('Select Difficulty', True, WHITE)
-    title_rect = title.get_rect(center=(WINDOW_SIZE // 2, WINDOW_SIZE // 4))
-    screen.blit(title, title_rect)
-    
-    # Draw instructions
-    font = pygame.font.Font(None, 48)
-    instructions = font.render('Press 1 for Easy, 2 for Medium, 3 for Hard', True, WHITE)
-    instructions_rect = instructions.get_rect(center=(WINDOW_SIZE // 2, WINDOW_SIZE // 2))
-    screen.blit(instructions, instructions_rect)
-    
-    pygame.display.flip()
+    renderer.draw_menu('Select Difficulty', 'Press 1 for Easy, 2 for Medium, 3 for Hard')
 
 def draw_first_move_menu(screen):
-    # Clear the screen
-    screen.fill(DGrey)
-    
-    # Draw title
-    font = pygame.font.Font(None, 74)
-    title = font.render('Who Makes First Move?', True, WHITE)
-    title_rect = title.get_rect(center=(WINDOW_SIZE // 2, WINDOW_SIZE // 4))
-    screen.blit(title, title_rect)
-    
-    # Draw instructions
-    font = pygame.font.Font(None, 48)
-    instructions = font.render('Press A for AI, S for Human', True, WHITE)
-    instructions_rect = instructions.get_rect(center=(WINDOW_SIZE // 2, WINDOW_SIZE // 2))
-    screen.blit(instructions, instructions_rect)
-    
-    pygame.display.flip()
+    renderer.draw_menu('Who Makes First Move?', 'Press A for AI, S for Human')
+
+def wait_events(timeout=0):
+    # Blocks until there is an event, or timeout ms pass when timeout > 0,
+    # so idle screens use no CPU. The clock caps event handling at 60 FPS.
+    clock.tick(60)
+    event = pygame.event.wait(timeout) if timeout else pygame.event.wait()
+    events = [] if event.type == pygame.NOEVENT else [event]
+    events.extend(pygame.event.get())
+    for event in events:
+        if event.type in REDRAW_EVENTS:
+            renderer.invalidate()
+    return events
 
 def get_difficulty_choice():
     choice_made = False
     
     while not choice_made:
-        for event in pygame.event.get():
+        draw_difficulty_menu(screen)
+        for event in wait_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -133,15 +224,13 @@ def get_difficulty_choice():
                     return 'Medium'
                 elif event.key == pygame.K_3:
                     return 'Hard'
-        
-        draw_difficulty_menu(screen)
-        pygame.time.Clock().tick(60)
 
 def get_first_move_choice():
     choice_made = False
     
     while not choice_made:
-        for event in pygame.event.get():
+        draw_first_move_menu(screen)
+        for event in wait_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -151,11 +240,9 @@ def get_first_move_choice():
                     return 2  # AI moves first
                 elif event.key == pygame.K_s:
                     return 1  # Human moves first
-        
-        draw_first_move_menu(screen)
-        pygame.time.Clock().tick(60)
 
 def main():
+    init_display()
     board = Board(BOARD_ROWS, BOARD_COLS)
     
     # Map difficulty levels to AI strategies
@@ -174,8 +261,12 @@ def main():
         choice = get_first_move_choice()
         ai_first = (choice == 2)  # Store who moves first
         
-        # Initialize AI with selected strategy
-        ai = Connect4AI(max_depth=4, strategy=strategy)
+        # Initialize AI with selected strategy, Hard searches as deep as it
+        # can in its time budget since the search no longer blocks the window
+        book_path = BOOK_PATH if strategy == 'minimax' and os.path.exists(BOOK_PATH) else None
+        time_limit_ms = HARD_TIME_LIMIT_MS if strategy == 'minimax' else None
+        ai = Connect4AI(max_depth=4, strategy=strategy, book_path=book_path,
+                        time_limit_ms=time_limit_ms)
         
         # Reset game state
         board = Board(BOARD_ROWS, BOARD_COLS)
@@ -184,22 +275,31 @@ def main():
         winner = None
         
         # If AI is chosen to move first
-        if ai_first:
-            ai_move = ai.get_move(board)
-            board.make_move(ai_move)
+        ai_worker = AIWorker(ai, board) if ai_first else None
         
         while not game_over:  # Game round loop
-            for event in pygame.event.get():
+            # Draw the board and current difficulty
+            draw_board(board, game_over, winner, difficulty, ai_first, thinking=ai_worker is not None)
+            
+            # idle until an event arrives, only waking up to animate the
+            # thinking indicator while the AI searches
+            for event in wait_events(THINKING_REDRAW_MS if ai_worker is not None else 0):
                 if event.type == pygame.QUIT:
+                    if ai_worker is not None:
+                        ai_worker.cancel()
+                    ai.close()
                     pygame.quit()
                     sys.exit()
                 
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_r:  # Restart game
+                        if ai_worker is not None:
+                            ai_worker.cancel()
+                            ai_worker = None
                         game_over = True  # Break out of game round loop
                         break  # Break out of game round loop to restart
                 
-                if event.type == pygame.MOUSEBUTTONDOWN and not game_over:
+                if event.type == pygame.MOUSEBUTTONDOWN and not game_over and ai_worker is None:
                     x, y = event.pos
                     col = x // SQUARE_SIZE
                     
@@ -215,36 +315,40 @@ def main():
                             if winner is not None:
                                 game_over = True
                             else:
-                                # AI's turn
-                                ai_move = ai.get_move(board)
-                                if ai_move is not None and board.is_valid_move(ai_move):
-                                    board.make_move(ai_move)
-                                    
-                                    # Check for game over again
-                                    winner = board.check_winner()
-                                    if winner is not None:
-                                        game_over = True
-                                else:
-                                    # If AI couldn't make a valid move, end the game as a draw
-                                    winner = 0  # 0 indicates a draw
-                                    game_over = True
+                                # AI's turn, searched in the background
+                                ai_worker = AIWorker(ai, board)
             
-            # Draw the board and current difficulty
-            draw_board(board, game_over, winner, difficulty, ai_first)
-            pygame.time.Clock().tick(60)  # Limit frame rate to 60 FPS
+            # Play the AI move once the background search has finished
+            if ai_worker is not None and ai_worker.done:
+                ai_move = ai_worker.move
+                ai_worker = None
+                if ai_move is not None and board.is_valid_move(ai_move):
+                    board.make_move(ai_move)
+                    
+                    # Check for game over again
+                    winner = board.check_winner()
+                    if winner is not None:
+                        game_over = True
+                    elif strategy == 'minimax':
+                        # keep searching the likely replies while the player thinks
+                        ai.start_pondering(board)
+                else:
+                    # If AI couldn't make a valid move, end the game as a draw
+                    winner = 0  # 0 indicates a draw
+                    game_over = True
+        ai.close()  # stop pondering
         
         # Show game over screen and wait for restart
         if winner is not None:  # Only show game over screen if there's a winner or draw
             waiting_for_restart = True
             while waiting_for_restart:
-                for event in pygame.event.get():
+                draw_board(board, game_over, winner, difficulty, ai_first)
+                for event in wait_events():
                     if event.type == pygame.QUIT:
                         pygame.quit()
                         sys.exit()
                     if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
                         waiting_for_restart = False
-                draw_board(board, game_over, winner, difficulty, ai_first)
-                pygame.time.Clock().tick(60)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,128 @@
+import time
+
+import numpy as np
+
+from board_batch import BoardBatch
+
+# Monte Carlo Tree Search (UCT). Each step selects a batch of leaves, every
+# selection adding virtual visits along its path so the next one spreads out,
+# and then plays all their random playouts together in one BoardBatch. The
+# tree itself lives in flat numpy arrays, a node is an index into them.
+
+class MCTS:
+    def __init__(self, playouts=20000, time_limit_ms=None, leaves_per_batch=64,
+                 playouts_per_leaf=16, exploration=1.4, seed=None):
+        # playouts caps the random games per search, time_limit_ms the wall time
+        self.playouts = playouts
+        self.time_limit_ms = time_limit_ms
+        self.leaves_per_batch = leaves_per_batch
+        self.playouts_per_leaf = playouts_per_leaf
+        self.exploration = exploration
+        self.rng = np.random.default_rng(seed)
+        self.reset(1024)
+        self.played = 0
+        self.depth_reached = 0
+
+    def reset(self, capacity):
+        self.size = 0
+        self.visits = np.zeros(capacity)
+        self.wins = np.zeros(capacity)  # for the player who moved into the node
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int8)
+        self.move = np.zeros(capacity, dtype=np.int8)
+        self.player = np.zeros(capacity, dtype=np.int8)
+
+    def add_nodes(self, moves, player):
+        # appends one node per move, all made by player, returns the first index
+        first = self.size
+        if first + len(moves) > len(self.visits):
+            capacity = 2 * (first + len(moves))
+            for name in ('visits', 'wins', 'first_child', 'child_count', 'move', 'player'):
+                array = getattr(self, name)
+                grown = np.full(capacity, -1 if name == 'first_child' else 0, dtype=array.dtype)
+                grown[:first] = array[:first]
+                setattr(self, name, grown)
+        self.move[first:first + len(moves)] = moves
+        self.player[first:first + len(moves)] = player
+        self.size += len(moves)
+        return first
+
+    def select_child(self, node):
+        first = self.first_child[node]
+        children = slice(first, first + self.child_count[node])
+        visits = self.visits[children]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uct = (self.wins[children] / visits
+                   + self.exploration * np.sqrt(np.log(self.visits[node]) / visits))
+        uct[visits == 0] = np.inf
+        return first + int(uct.argmax())
+
+    def expand(self, node, board):
+        moves = board.get_valid_moves()
+        self.first_child[node] = self.add_nodes(moves, board.current_player)
+        self.child_count[node] = len(moves)
+
+    def search(self, board):
+        # returns (best move, win rate of that move)
+        deadline = None
+        if self.time_limit_ms is not None:
+            deadline = time.perf_counter() + self.time_limit_ms / 1000
+
+        self.reset(1024)
+        root = self.add_nodes([0], 3 - board.current_player)
+        self.expand(root, board)
+        self.played = 0
+        self.depth_reached = 0
+        per_leaf = self.playouts_per_leaf
+        while self.played < self.playouts:
+            if deadline is not None and self.played and time.perf_counter() > deadline:
+                break
+            paths, finished, positions, masks, to_move = [], [], [], [], []
+            for _ in range(self.leaves_per_batch):
+                path = [root]
+                node = root
+                while self.first_child[node] >= 0 and not board.is_terminal():
+                    node = self.select_child(node)
+                    board.make_move(int(self.move[node]))
+                    path.append(node)
+                if not board.is_terminal() and self.visits[node] > 0:
+                    # visited leaf: grow the tree and simulate one new child
+                    self.expand(node, board)
+                    node = self.first_child[node] + int(self.rng.integers(self.child_count[node]))
+                    board.make_move(int(self.move[node]))
+                    path.append(node)
+                self.visits[path] += per_leaf  # virtual visits until the results arrive
+                self.depth_reached = max(self.depth_reached, len(path) - 1)
+                if board.is_terminal():
+                    finished.append((path, board.check_winner()))
+                else:
+                    paths.append(path)
+                    positions.append(board.bitboards[board.current_player - 1])
+                    masks.append(board.mask)
+                    to_move.append(board.current_player)
+                for node in reversed(path[1:]):
+                    board.undo_move(int(self.move[node]))
+
+            for path, winner in finished:
+                self.backpropagate(path, np.full(per_leaf, winner))
+            if paths:
+                games = BoardBatch(len(paths) * per_leaf, board.rows, board.cols, board.connect)
+                games.position[:] = np.repeat(np.array(positions, dtype=np.uint64), per_leaf)
+                games.mask[:] = np.repeat(np.array(masks, dtype=np.uint64), per_leaf)
+                games.current_player[:] = np.repeat(to_move, per_leaf)
+                winners = games.playout(self.rng)
+                for path, results in zip(paths, winners.reshape(len(paths), per_leaf)):
+                    self.backpropagate(path, results)
+            self.played += self.leaves_per_batch * per_leaf
+
+        first = self.first_child[root]
+        children = slice(first, first + self.child_count[root])
+        best = first + int(self.visits[children].argmax())
+        return int(self.move[best]), self.wins[best] / self.visits[best]
+
+    def backpropagate(self, path, winners):
+        # visits were added during selection, only the wins are missing
+        wins = {player: np.count_nonzero(winners == player) for player in (1, 2)}
+        draws = len(winners) - wins[1] - wins[2]
+        for node in path:
+            self.wins[node] += wins[int(self.player[node])] + draws / 2
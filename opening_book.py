@@ -0,0 +1,120 @@
+import argparse
+import mmap
+import os
+import struct
+
+from board import Board
+
+# File layout: header, then records sorted by key. A record is the canonical
+# position key (Board.position_key) and the book move in the canonical
+# orientation, so a position and its mirror image share one record.
+MAGIC = b'C4BK'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBI')  # magic, version, rows, cols, record count
+RECORD = struct.Struct('<QB')  # key, move
+
+# books opened in this process, every Connect4AI using a path shares one map
+_open_books = {}
+
+class OpeningBook:
+    # The file is mapped on the first lookup, so creating a book costs nothing
+    # at startup. Pages of the map come from the OS page cache and are shared
+    # by every process that opens the same file.
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self.rows = self.cols = self.count = None
+
+    def open(self):
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not an opening book")
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def lookup(self, board):
+        # book move for the position or None, binary search over the records
+        if self.map is None:
+            self.open()
+        if (board.rows, board.cols, board.connect) != (self.rows, self.cols, 4):
+            return None  # books are built for connect four only
+
+        key, mirrored = board.position_key()
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            found, move = RECORD.unpack_from(self.map, HEADER.size + mid * RECORD.size)
+            if found < key:
+                low = mid + 1
+            elif found > key:
+                high = mid
+            else:
+                return board.cols - 1 - move if mirrored else move
+        return None
+
+def load_book(path):
+    if path not in _open_books:
+        _open_books[path] = OpeningBook(path)
+    return _open_books[path]
+
+def book_positions(plies, rows=6, cols=7, player=2):
+    # canonical keys of every position within `plies` moves of the start
+    # where `player` is to move, whichever side moved first
+    seen = set()
+
+    def visit(board, depth):
+        key, _ = board.position_key()
+        if key in seen:
+            return
+        seen.add(key)
+        if board.current_player == player:
+            yield board
+        if depth == plies:
+            return
+        for col in board.get_valid_moves():
+            board.make_move(col)
+            if not board.is_terminal():
+                yield from visit(board, depth + 1)
+            board.undo_move(col)
+
+    for first in (1, 2):
+        board = Board(rows, cols)
+        board.set_first_player(first)
+        yield from visit(board, 0)
+
+def build_book(path, plies=6, depth=8, rows=6, cols=7, progress=True):
+    # search every book position with the minimax engine and write the
+    # sorted records
+    from ai_agent import Connect4AI
+    ai = Connect4AI(max_depth=depth)
+    records = {}
+    for board in book_positions(plies, rows, cols):
+        key, mirrored = board.position_key()
+        move = ai.get_move(board)
+        records[key] = board.cols - 1 - move if mirrored else move
+        if progress and len(records) % 100 == 0:
+            print(f"{len(records)} positions searched")
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, cols, len(records)))
+        for key in sorted(records):
+            f.write(RECORD.pack(key, records[key]))
+    os.replace(tmp_path, path)  # readers never see a half-written book
+    return len(records)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a Connect4 opening book")
+    parser.add_argument('--output', default='opening_book.bin')
+    parser.add_argument('--plies', type=int, default=6, help="book covers the first N plies")
+    parser.add_argument('--depth', type=int, default=8, help="minimax depth per position")
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    args = parser.parse_args()
+    count = build_book(args.output, args.plies, args.depth, args.rows, args.cols)
+    print(f"wrote {count} positions to {args.output}")
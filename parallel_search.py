@@ -0,0 +1,170 @@
+import argparse
+import multiprocessing as mp
+import time
+
+from board import Board
+from ai_agent import Connect4AI, SearchTimeout
+from transposition import SharedTranspositionTable
+
+# per-process search state, set up once by _init_worker and reused by every task
+_worker = None
+
+def board_spec(board):
+    # picklable description of a board: dimensions, line length, (col, player)
+    # moves and the player to move
+    moves = [(col, player) for _, col, player, _ in board.history]
+    return board.rows, board.cols, board.connect, moves, board.current_player
+
+def board_from_spec(spec):
+    rows, cols, connect, moves, current_player = spec
+    board = Board(rows, cols, connect)
+    for col, player in moves:
+        board.current_player = player
+        board.make_move(col)
+    board.current_player = current_player
+    return board
+
+def _init_worker(config, tt_buffers, alpha):
+    global _worker
+    ai = Connect4AI(**config)
+    ai.tt = SharedTranspositionTable(buffers=tt_buffers)
+    _worker = (ai, alpha)
+
+def _set_deadline(ai, deadline):
+    # deadlines travel as wall-clock time, perf_counter is per process
+    if deadline is None:
+        ai.deadline = None
+    else:
+        ai.deadline = time.perf_counter() + (deadline - time.time())
+
+def _search_root_moves(spec, cols, depth, deadline):
+    # root splitting: search a share of the root columns, raising the alpha
+    # shared by all workers after each one
+    ai, alpha = _worker
+    board = board_from_spec(spec)
+    ai.nodes = ai.next_check = 0
+    ai.killers = {}
+    _set_deadline(ai, deadline)
+    results = []
+    try:
+        for col in cols:
+            window = alpha.value
+            board.make_move(col)
+            score = ai.minimax(board, depth - 1, False, window, float('inf'))
+            board.undo_move(col)
+            # only a score above the alpha it was searched with is exact
+            results.append((col, score, score > window))
+            with alpha.get_lock():
+                if score > alpha.value:
+                    alpha.value = score
+    except SearchTimeout:
+        results = None
+    ai.deadline = None
+    return results, ai.nodes
+
+def _search_lazy(spec, worker_index, max_depth, time_limit_ms):
+    # lazy SMP: every worker searches the whole root, odd workers skip depth
+    # 1 so the workers stay a ply apart and fill the shared table for each other
+    ai, _ = _worker
+    board = board_from_spec(spec)
+    ai.max_depth = max_depth
+    ai.time_limit_ms = time_limit_ms
+    move = ai.get_best_move_minimax(board, start_depth=1 + worker_index % 2)
+    return move, ai.depth_reached, ai.nodes
+
+class ParallelSearch:
+    def __init__(self, workers, config, mode='root', tt_size_mb=16):
+        if mode not in ('root', 'lazy_smp'):
+            raise ValueError(f"unknown parallel mode: {mode}")
+        self.workers = workers
+        self.mode = mode
+        ctx = mp.get_context()
+        self.table = SharedTranspositionTable(tt_size_mb)
+        self.alpha = ctx.Value('d', float('-inf'))
+        # the pool lives as long as this object so processes are spawned once
+        self.pool = ctx.Pool(workers, _init_worker, (config, self.table.buffers, self.alpha))
+        # used for root move ordering in the parent process
+        self.ai = Connect4AI(**config)
+
+    def new_game(self):
+        self.table.clear()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def search(self, board, max_depth, time_limit_ms=None):
+        # returns (best move, depth reached, nodes searched)
+        if self.mode == 'lazy_smp':
+            return self.search_lazy(board, max_depth, time_limit_ms)
+        return self.search_root(board, max_depth, time_limit_ms)
+
+    def search_root(self, board, max_depth, time_limit_ms):
+        spec = board_spec(board)
+        deadline = None
+        if time_limit_ms is not None:
+            deadline = time.time() + time_limit_ms / 1000
+            max_depth = board.rows * board.cols - board.moves
+
+        best_move = None
+        depth_reached = 0
+        nodes = 0
+        for depth in range(1, max_depth + 1):
+            moves = self.ai.order_moves(board, best_move)
+            shares = [moves[i::self.workers] for i in range(self.workers) if moves[i::self.workers]]
+            self.alpha.value = float('-inf')
+            # depth 1 always completes so there is a move to return
+            task_deadline = None if depth == 1 else deadline
+            results = self.pool.starmap(
+                _search_root_moves, [(spec, share, depth, task_deadline) for share in shares])
+            nodes += sum(count for _, count in results)
+            if any(scores is None for scores, _ in results):
+                break
+
+            # best exact score, ties broken by root move order
+            exact = {col: score for scores, _ in results for col, score, is_exact in scores if is_exact}
+            if not exact:
+                exact = {col: score for scores, _ in results for col, score, _ in scores}
+            best_move = max(moves, key=lambda col: (exact.get(col, float('-inf')), -moves.index(col)))
+            depth_reached = depth
+            if deadline is not None and time.time() > deadline:
+                break
+        return best_move, depth_reached, nodes
+
+    def search_lazy(self, board, max_depth, time_limit_ms):
+        spec = board_spec(board)
+        results = self.pool.starmap(
+            _search_lazy, [(spec, i, max_depth, time_limit_ms) for i in range(self.workers)])
+        nodes = sum(count for _, _, count in results)
+        # deepest completed search wins, worker 0 on ties
+        finished = [(depth, -i, move) for i, (move, depth, _) in enumerate(results) if move is not None]
+        depth, _, move = max(finished)
+        return move, depth, nodes
+
+def scaling_report(moves=(3, 3, 2), worker_counts=(1, 2, 4, 8, 16), max_depth=7, mode='root'):
+    # nodes/sec of one search from a fixed position for each worker count
+    board = Board()
+    for col in moves:
+        board.make_move(col)
+    base = None
+    for workers in worker_counts:
+        ai = Connect4AI(max_depth=max_depth, workers=workers, parallel_mode=mode)
+        if workers > 1:
+            ai.parallel_move(Board())  # start the pool outside the timing
+            ai.new_game()
+        start = time.perf_counter()
+        move = ai.get_best_move_minimax(board)
+        elapsed = time.perf_counter() - start
+        rate = ai.nodes / elapsed
+        base = base or rate
+        print(f"workers={workers:3d} move={move} depth={ai.depth_reached} nodes={ai.nodes} "
+              f"time={elapsed:.2f}s nodes/sec={rate:,.0f} scaling={rate / base:.2f}x")
+        ai.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel minimax nodes/sec scaling report")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--depth', type=int, default=7)
+    parser.add_argument('--mode', choices=['root', 'lazy_smp'], default='root')
+    args = parser.parse_args()
+    scaling_report(worker_counts=args.workers, max_depth=args.depth, mode=args.mode)
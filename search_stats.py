@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+
+PHASES = ('generation', 'evaluation', 'terminal')
+
+class SearchStats:
+    # what one get_move call did, see Connect4AI.get_move(return_stats=True)
+    def __init__(self, strategy, source, nodes=0, leaf_evals=0, cutoffs=0,
+                 first_move_cutoffs=0, depth_reached=0, tt_probes=0, tt_hits=0,
+                 wall_time=0.0, phase_times=None, profile=None, score=None,
+                 eval_cache_hits=0, eval_cache_misses=0):
+        self.strategy = strategy
+        self.source = source  # 'book', 'solver', 'search', 'parallel' or the strategy name
+        self.nodes = nodes
+        self.leaf_evals = leaf_evals
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.depth_reached = depth_reached
+        self.tt_probes = tt_probes
+        self.tt_hits = tt_hits
+        self.wall_time = wall_time
+        # seconds per phase, only measured with Connect4AI(timing=True)
+        self.phase_times = phase_times
+        # (function, samples, share) rows, only with Connect4AI(profile=True)
+        self.profile = profile
+        # root score for the side to move: heuristic units (+-inf for a
+        # forced win or loss) from a search, the distance-to-end scale of
+        # solver.py from the solver, the win rate of the move from mcts and
+        # None from the book or the other strategies
+        self.score = score
+        self.eval_cache_hits = eval_cache_hits
+        self.eval_cache_misses = eval_cache_misses
+
+    @property
+    def first_move_cutoff_rate(self):
+        # share of cutoffs caused by the first move tried, a measure of move ordering
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def effective_branching_factor(self):
+        if self.depth_reached <= 0 or self.nodes <= 1:
+            return 0.0
+        return self.nodes ** (1 / self.depth_reached)
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def eval_cache_hit_rate(self):
+        lookups = self.eval_cache_hits + self.eval_cache_misses
+        return self.eval_cache_hits / lookups if lookups else 0.0
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.wall_time if self.wall_time else 0.0
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        for name in ('first_move_cutoff_rate', 'effective_branching_factor',
+                     'tt_hit_rate', 'eval_cache_hit_rate', 'nodes_per_sec'):
+            stats[name] = getattr(self, name)
+        return stats
+
+    def __repr__(self):
+        return (f"SearchStats(source={self.source}, nodes={self.nodes}, depth={self.depth_reached}, "
+                f"cutoffs={self.cutoffs}, first_move_cutoff_rate={self.first_move_cutoff_rate:.2f}, "
+                f"ebf={self.effective_branching_factor:.2f}, tt_hit_rate={self.tt_hit_rate:.2f}, "
+                f"wall_time={self.wall_time * 1000:.1f}ms)")
+
+def timed(function, phase_times, phase):
+    # wraps a bound method so its wall time is added to phase_times[phase],
+    # installed only when timing is on so the default path pays nothing
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            phase_times[phase] += time.perf_counter() - start
+    return wrapper
+
+class SamplingProfiler:
+    # Samples the stack of one thread from a background thread and counts the
+    # innermost frame that belongs to one of `files`. Nothing runs unless a
+    # profiler is started.
+    def __init__(self, interval=0.001, files=('board.py', 'ai_agent.py', 'evaluation.py',
+                                              'transposition.py', 'solver.py')):
+        self.interval = interval
+        self.files = set(files)
+        self.samples = {}
+        self.total = 0
+        self.target = None
+        self.thread = None
+        self.running = False
+
+    def start(self, thread_id=None):
+        self.target = thread_id if thread_id is not None else threading.get_ident()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while self.running:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self.target)
+            while frame is not None:
+                code = frame.f_code
+                name = os.path.basename(code.co_filename)
+                if name in self.files:
+                    key = f"{name}:{code.co_name}"
+                    self.samples[key] = self.samples.get(key, 0) + 1
+                    self.total += 1
+                    break
+                frame = frame.f_back
+
+    def report(self, top=10):
+        # (function, samples, share of samples) rows, most sampled first
+        rows = sorted(self.samples.items(), key=lambda item: -item[1])[:top]
+        return [(name, count, count / self.total) for name, count in rows]
@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from ai_agent import Connect4AI
+from arena import config_name, engine_view, percentiles
+from parallel_search import board_spec, board_from_spec
+from evaluation import WIN_SCORE
+
+# Headless game server. Clients send one JSON object per line and get one
+# JSON object per line back, requests of a connection are answered in order:
+#   {"op": "new", "rows": 6, "cols": 7, "connect": 4, "first_player": 1,
+#    "engine": {"strategy": "minimax"}}      -> {"ok": true, "session": 1, ...}
+#   {"op": "move", "session": 1, "col": 3}  -> position after the move
+#   {"op": "ai", "session": 1, "time_ms": 500} -> engine move, played on the board
+#   {"op": "state", "session": 1}, {"op": "close", "session": 1}, {"op": "metrics"}
+# An "id" in a request is echoed in its response. Sessions belong to the
+# connection that created them and end with it.
+
+# every search runs on the request's time budget, so max_depth is not
+# offered: a time-limited minimax deepens until the budget runs out
+ENGINE_OPTIONS = ('strategy', 'playouts', 'solver_threshold')
+STRATEGIES = ('minimax', 'hill_climbing', 'simulated_annealing', 'mcts')
+# allowed range of each numeric engine option. The solver runs at most half
+# the move budget, but a large threshold still wastes it on positions it
+# cannot solve
+ENGINE_LIMITS = {'playouts': (1, 1000000), 'solver_threshold': (0, 14)}
+MAX_BOARD_SIZE = 32
+TIMEOUT_GRACE_S = 2.0  # a search may overrun its budget by this much before the reply gives up
+LATENCY_SAMPLES = 1000
+
+# engines of a worker process, one per configuration and board shape
+_engines = {}
+
+def is_int(value):
+    # JSON true and false load as bools, which are ints to Python
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def search(spec, config, time_limit_ms):
+    # runs in a worker process: the engine move for the side to move
+    board = board_from_spec(spec)
+    key = (config_name(config), board.rows, board.cols, board.connect)
+    if key not in _engines:
+        _engines[key] = Connect4AI(**config)
+    engine = _engines[key]
+    engine.time_limit_ms = time_limit_ms
+    move, stats = engine.get_move(engine_view(board, board.current_player), return_stats=True)
+    score = stats.score
+    if score is not None and abs(score) == float('inf'):
+        score = WIN_SCORE if score > 0 else -WIN_SCORE
+    return move, {'score': score, 'depth': stats.depth_reached, 'nodes': stats.nodes,
+                  'source': stats.source, 'search_ms': stats.wall_time * 1000}
+
+class RequestError(Exception):
+    # reported to the client as {"ok": false, "error": ...}
+    pass
+
+class Session:
+    def __init__(self, board, config):
+        self.board = board
+        self.config = config
+
+    def state(self):
+        board = self.board
+        return {
+            'moves': [col for _, col, _, _ in board.history],
+            'to_move': board.current_player,
+            'winner': board.check_winner(),
+            'valid_moves': [] if board.is_terminal() else board.get_valid_moves(),
+        }
+
+class GameServer:
+    # max_queue bounds the searches queued or running in the pool, requests
+    # beyond it are refused with "server busy" instead of piling up
+    def __init__(self, workers=None, max_queue=64, default_time_ms=1000, max_time_ms=10000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.default_time_ms = default_time_ms
+        self.max_time_ms = max_time_ms
+        self.executor = None
+        self.server = None
+        self.session_ids = itertools.count(1)
+        self.sessions = 0
+        self.sessions_total = 0
+        self.connections = {}  # writer -> handler task of every open connection
+        self.pending = 0
+        self.searches = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.started = time.time()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        # listens on a Unix socket when path is given, otherwise on TCP
+        # (port 0 picks a free port, see self.address)
+        self.executor = ProcessPoolExecutor(self.workers)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            handlers = list(self.connections.values())
+            for writer in self.connections:
+                writer.close()  # ends the reads of their handlers
+            if handlers:
+                await asyncio.wait(handlers, timeout=1.0)
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        self.connections[writer] = asyncio.current_task()
+        sessions = {}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than the stream limit
+                    await self.send(writer, {'ok': False, 'error': "request too long"})
+                    break
+                if not line:
+                    break
+                await self.send(writer, await self.respond(line, sessions))
+        except ConnectionError:
+            pass
+        finally:
+            del self.connections[writer]
+            self.sessions -= len(sessions)
+            writer.close()
+
+    async def send(self, writer, response):
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()  # waits while the client is not reading
+
+    async def respond(self, line, sessions):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get('id')
+            response = await self.dispatch(request, sessions)
+            response['ok'] = True
+        except ValueError as error:  # malformed JSON
+            response = {'ok': False, 'error': f"bad request: {error}"}
+        except RequestError as error:
+            response = {'ok': False, 'error': str(error)}
+        except Exception as error:  # a bug must not end the connection
+            response = {'ok': False, 'error': f"internal error: {error!r}"}
+        if request_id is not None:
+            response['id'] = request_id
+        return response
+
+    async def dispatch(self, request, sessions):
+        op = request.get('op')
+        if op == 'new':
+            return self.new_session(request, sessions)
+        if op == 'metrics':
+            return self.metrics()
+        session_id = request.get('session')
+        if not is_int(session_id) or session_id not in sessions:
+            raise RequestError(f"unknown session {session_id!r}")
+        session = sessions[session_id]
+        if op == 'state':
+            return session.state()
+        if op == 'move':
+            return self.play(session, request.get('col'))
+        if op == 'ai':
+            return await self.ai_move(session, request.get('time_ms'))
+        if op == 'close':
+            del sessions[session_id]
+            self.sessions -= 1
+            return {}
+        raise RequestError(f"unknown op {op!r}")
+
+    def new_session(self, request, sessions):
+        rows, cols, connect = (request.get(name, default) for name, default
+                               in (('rows', 6), ('cols', 7), ('connect', 4)))
+        for value in (rows, cols, connect):
+            if not is_int(value) or not 1 <= value <= MAX_BOARD_SIZE:
+                raise RequestError(f"board size must be 1..{MAX_BOARD_SIZE}")
+        first_player = request.get('first_player', 1)
+        if not is_int(first_player) or first_player not in (1, 2):
+            raise RequestError("first_player must be 1 or 2")
+        config = request.get('engine', {})
+        if not isinstance(config, dict) or set(config) - set(ENGINE_OPTIONS):
+            raise RequestError(f"engine options are {', '.join(ENGINE_OPTIONS)}")
+        if config.get('strategy', 'minimax') not in STRATEGIES:
+            raise RequestError(f"strategy must be one of {', '.join(STRATEGIES)}")
+        for name, (low, high) in ENGINE_LIMITS.items():
+            value = config.get(name, low)
+            if name == 'solver_threshold' and value is None:
+                continue  # turns the solver off
+            if not is_int(value) or not low <= value <= high:
+                raise RequestError(f"{name} must be {low}..{high}")
+
+        board = Board(rows, cols, connect)
+        board.set_first_player(first_player)
+        session_id = next(self.session_ids)
+        sessions[session_id] = Session(board, config)
+        self.sessions += 1
+        self.sessions_total += 1
+        return {'session': session_id, **sessions[session_id].state()}
+
+    def play(self, session, col):
+        if session.board.is_terminal():
+            raise RequestError("game is over")
+        if not is_int(col) or not session.board.make_move(col):
+            raise RequestError(f"illegal move {col!r}")
+        return session.state()
+
+    async def ai_move(self, session, time_ms):
+        board = session.board
+        if board.is_terminal():
+            raise RequestError("game is over")
+        if time_ms is None:
+            time_ms = self.default_time_ms
+        if not isinstance(time_ms, (int, float)) or isinstance(time_ms, bool) or time_ms <= 0:
+            raise RequestError("time_ms must be a positive number")
+        time_ms = min(time_ms, self.max_time_ms)
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise RequestError("server busy")
+
+        self.pending += 1
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, search, board_spec(board), session.config, time_ms)
+        # pending drops when the worker is really done, even after a timeout
+        future.add_done_callback(self.search_done)
+        try:
+            move, stats = await asyncio.wait_for(asyncio.shield(future),
+                                                 time_ms / 1000 + TIMEOUT_GRACE_S)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise RequestError("search timed out")
+        except Exception as error:  # e.g. a board mcts cannot play
+            raise RequestError(f"search failed: {error}")
+        self.latencies.append(time.perf_counter() - start)
+        self.searches += 1
+        if move is None or not board.make_move(move):
+            raise RequestError("engine found no move")
+        return {'move': move, **stats, **session.state()}
+
+    def search_done(self, future):
+        self.pending -= 1
+
+    def metrics(self):
+        return {
+            'uptime_s': time.time() - self.started,
+            'connections': len(self.connections),
+            'sessions': self.sessions,
+            'sessions_total': self.sessions_total,
+            'queue_depth': self.pending,
+            'max_queue': self.max_queue,
+            'searches': self.searches,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'move_latency_ms': {name: value * 1000
+                                for name, value in percentiles(list(self.latencies)).items()},
+        }
+
+async def serve(host='127.0.0.1', port=4004, path=None, **options):
+    server = GameServer(**options)
+    await server.start(host, port, path)
+    print(f"listening on {path or server.address}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect4 game server, line-delimited JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4004)
+    parser.add_argument('--unix', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="search processes, default: one per CPU")
+    parser.add_argument('--max-queue', type=int, default=64, help="searches queued or running at most")
+    parser.add_argument('--default-time-ms', type=int, default=1000)
+    parser.add_argument('--max-time-ms', type=int, default=10000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, workers=args.workers,
+                          max_queue=args.max_queue, default_time_ms=args.default_time_ms,
+                          max_time_ms=args.max_time_ms))
+    except KeyboardInterrupt:
+        pass
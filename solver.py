@@ -0,0 +1,134 @@
+import time
+
+from transposition import TranspositionTable, UPPER
+
+# Exact negamax solver. Scores are from the point of view of the player to
+# move and encode the distance to the end of the game: a win with the k-th
+# stone of the winner scores (cells + 1 - stones played before it) // 2, so
+# faster wins score higher, 0 is a draw and losses are negative.
+
+# nodes between checks of the deadline and the cancel event
+CHECK_INTERVAL = 1024
+
+class SearchTimeout(Exception):
+    # raised inside a search when the time budget of a move runs out or the
+    # search is cancelled
+    pass
+
+class Solver:
+    def __init__(self, tt_size_mb=16):
+        # holds upper bounds only, kept between solves of one game
+        self.tt = TranspositionTable(tt_size_mb)
+        self.nodes = 0
+        self.next_check = 0
+        # a perf_counter time and a threading.Event, solve raises
+        # SearchTimeout once the time is up or the event is set
+        self.deadline = None
+        self.cancel_event = None
+
+    def solve(self, board):
+        # (score, best move) of the position, best move is None when the
+        # game is already over
+        winner = board.check_winner()
+        cells = board.rows * board.cols
+        if winner is not None:
+            if winner == 0:
+                return 0, None
+            # the previous move won, the player to move has lost
+            score = -((cells + 2 - board.moves) // 2)
+            return (score if winner != board.current_player else -score), None
+
+        self.nodes = self.next_check = 0
+        start_moves = board.moves
+        try:
+            score = self.score(board)
+
+            # first move, center out, whose child proves the same score
+            for col in self.order(board):
+                if self.can_win(board, col):
+                    return score, col
+            for col in self.order(board):
+                board.make_move(col)
+                child = self.negamax(board, -score, -score + 1)
+                board.undo_move(col)
+                if child <= -score:
+                    return score, col
+            return score, None
+        except SearchTimeout:
+            # unwind the moves of the interrupted search
+            while board.moves > start_moves:
+                board.undo_move(board.last_move[1])
+            raise
+
+    def score(self, board):
+        # narrow [low, high] with null-window probes, each one only answers
+        # "is the score above guess"
+        cells = board.rows * board.cols
+        low = -(cells - board.moves) // 2
+        high = (cells + 1 - board.moves) // 2
+        while low < high:
+            guess = low + (high - low) // 2
+            # probe close to 0 first, most positions are near a draw
+            if guess <= 0 and low // 2 < guess:
+                guess = low // 2
+            elif guess >= 0 and high // 2 > guess:
+                guess = high // 2
+            result = self.negamax(board, guess, guess + 1)
+            if result <= guess:
+                high = result
+            else:
+                low = result
+        return low
+
+    def negamax(self, board, alpha, beta):
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.next_check = self.nodes + CHECK_INTERVAL
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise SearchTimeout()
+        cells = board.rows * board.cols
+        if board.moves == cells:
+            return 0
+        if board.winning_moves(board.current_player):
+            return (cells + 1 - board.moves) // 2
+
+        # no immediate win, so the best case is winning with the next stone
+        best = (cells - 1 - board.moves) // 2
+        key, _ = board.position_key()
+        entry = self.tt.probe(key)
+        if entry is not None:
+            best = entry[2]
+        if beta > best:
+            beta = best
+            if alpha >= beta:
+                return beta
+
+        for col in self.order(board):
+            board.make_move(col)
+            score = -self.negamax(board, -beta, -alpha)
+            board.undo_move(col)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.tt.store(key, 0, alpha, UPPER, None)
+        return alpha
+
+    def can_win(self, board, col):
+        # would the player to move complete a four by playing col
+        if board.heights[col] >= board.rows:
+            return False
+        bit = 1 << (col * board.height + board.heights[col])
+        return bool(board.threats[board.current_player - 1] & bit)
+
+    def order(self, board):
+        # center columns first
+        center = (board.cols - 1) / 2
+        return sorted(board.get_valid_moves(), key=lambda col: abs(col - center))
+
+def solve(board, solver=None):
+    # solve(board) -> (score, best_move), see Solver for the score scale
+    return (solver or Solver()).solve(board)
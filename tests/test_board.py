@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from board import Board
+
+# Board's bitboards, threat maps and line counters checked against a plain
+# grid scan after every move and undo of random games.
+
+STEPS = ((0, 1), (1, 0), (1, 1), (1, -1))  # (drow, dcol)
+
+def grid_of(board):
+    # grid[row][col], row 0 is the bottom row
+    grid = [[0] * board.cols for _ in range(board.rows)]
+    for row, col, player, _ in board.history:
+        grid[row][col] = player
+    return grid
+
+def line_through(grid, row, col, player, connect):
+    # would a piece of player at (row, col) be part of `connect` in a line
+    rows, cols = len(grid), len(grid[0])
+    for dr, dc in STEPS:
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign * dr, col + sign * dc
+            while 0 <= r < rows and 0 <= c < cols and grid[r][c] == player:
+                count += 1
+                r, c = r + sign * dr, c + sign * dc
+        if count >= connect:
+            return True
+    return False
+
+def brute_winner(board):
+    grid = grid_of(board)
+    for row in range(board.rows):
+        for col in range(board.cols):
+            player = grid[row][col]
+            if player and line_through(grid, row, col, player, board.connect):
+                return player
+    return 0 if board.moves == board.rows * board.cols else None
+
+def brute_threats(board, player):
+    grid = grid_of(board)
+    cells = 0
+    for row in range(board.rows):
+        for col in range(board.cols):
+            if not grid[row][col] and line_through(grid, row, col, player, board.connect):
+                cells |= 1 << (col * board.height + row)
+    return cells
+
+def brute_open_lines(board):
+    # per player the lines of `connect` cells with k own pieces and none of
+    # the opponent's
+    grid = grid_of(board)
+    counts = [[0] * (board.connect + 1), [0] * (board.connect + 1)]
+    for row in range(board.rows):
+        for col in range(board.cols):
+            for dr, dc in STEPS:
+                end_row = row + dr * (board.connect - 1)
+                end_col = col + dc * (board.connect - 1)
+                if not (0 <= end_row < board.rows and 0 <= end_col < board.cols):
+                    continue
+                cells = [grid[row + i * dr][col + i * dc] for i in range(board.connect)]
+                for player in (1, 2):
+                    own = cells.count(player)
+                    if own and not cells.count(3 - player):
+                        counts[player - 1][own] += 1
+    return counts
+
+def check(board):
+    assert board.check_winner() == brute_winner(board)
+    for player in (1, 2):
+        threats = brute_threats(board, player)
+        assert board.threats[player - 1] == threats
+        playable = [col for col in board.get_valid_moves()
+                    if threats >> (col * board.height + board.heights[col]) & 1]
+        assert board.winning_moves(player) == playable
+    if board.sparse:
+        assert board.open_lines[0][1:] == brute_open_lines(board)[0][1:]
+        assert board.open_lines[1][1:] == brute_open_lines(board)[1][1:]
+
+@pytest.mark.parametrize('rows, cols, connect', [
+    (6, 7, 4), (4, 4, 4), (5, 5, 3), (7, 9, 5), (12, 12, 4), (11, 13, 5)])
+def test_random_games_match_grid_scan(rows, cols, connect):
+    rng = random.Random(rows * 100 + cols * 10 + connect)
+    for _ in range(6):
+        board = Board(rows, cols, connect)
+        keys = [(board.zobrist, board.compact_key(), tuple(board.threats))]
+        while not board.is_terminal() and board.moves < 60:
+            col = rng.choice(board.get_valid_moves())
+            assert board.make_move(col)
+            check(board)
+            keys.append((board.zobrist, board.compact_key(), tuple(board.threats)))
+        # undo restores every earlier position exactly
+        while board.history:
+            board.undo_move(board.last_move[1])
+            keys.pop()
+            assert (board.zobrist, board.compact_key(), tuple(board.threats)) == keys[-1]
+        check(board)
+        assert not board.lines
+
+def test_illegal_moves_are_refused():
+    board = Board(2, 3)
+    assert not board.make_move(-1)
+    assert not board.make_move(3)
+    assert board.make_move(0) and board.make_move(0)
+    assert not board.make_move(0)
+    with pytest.raises(ValueError):
+        Board.from_moves([0, 0, 0], 2, 3)
+
+def test_double_threat():
+    # player 1 has both ends of an open three on the bottom row
+    board = Board.from_moves([2, 2, 3, 3, 4, 4])
+    assert board.winning_moves(1) == [1, 5]
+    assert board.has_double_threat(1)
+    assert board.must_block(2) == [1, 5]
+
+def test_position_key_folds_mirror_images():
+    board, mirror = Board.from_moves([0, 1, 1]), Board.from_moves([6, 5, 5])
+    assert board.position_key()[0] == mirror.position_key()[0]
+    assert board.position_key()[1] != mirror.position_key()[1]
+    assert board.position_key(mirror=False)[0] != mirror.position_key(mirror=False)[0]
+
+def test_sparse_undo_history_keeps_only_changed_cells():
+    board = Board(40, 40, connect=5)
+    for col in (20, 21, 22, 20, 21):
+        board.make_move(col)
+    for entry in board.threat_history:
+        own_filled, opp_filled, added = entry
+        assert len(added) <= 4 * (board.connect - 1)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from board import Board
+from board_batch import BoardBatch, RUNNING, ILLEGAL, fits
+
+# BoardBatch checked game by game against Board, including illegal moves.
+
+def expected(board):
+    winner = board.check_winner()
+    return RUNNING if winner is None else winner
+
+@pytest.mark.parametrize('rows, cols, connect', [(6, 7, 4), (4, 5, 3), (5, 6, 4), (3, 9, 5)])
+def test_batch_matches_board(rows, cols, connect):
+    rng = np.random.default_rng(rows * cols)
+    n = 100
+    batch = BoardBatch(n, rows, cols, connect)
+    boards = [Board(rows, cols, connect) for _ in range(n)]
+    for _ in range(rows * cols + 2):
+        moves = rng.integers(-1, cols + 1, n)
+        results = batch.make_moves(moves)
+        for board, col, result in zip(boards, moves.tolist(), results.tolist()):
+            if board.is_terminal() or not board.make_move(col):
+                assert result == ILLEGAL
+            else:
+                assert result == expected(board)
+        grids = batch.grids()
+        keys = batch.keys()
+        valid = batch.valid_move_mask()
+        winners = batch.check_winners()
+        for i, board in enumerate(boards):
+            assert (grids[i] == board.board).all()
+            assert keys[i] == board.compact_key()
+            assert batch.current_player[i] == board.current_player
+            assert winners[i] == expected(board)
+            legal = [] if board.is_terminal() else board.get_valid_moves()
+            assert np.flatnonzero(valid[i]).tolist() == legal
+    assert batch.board(0).compact_key() == boards[0].compact_key()
+
+def test_auto_reset():
+    rng = np.random.default_rng(0)
+    batch = BoardBatch(64, auto_reset=True)
+    finished = 0
+    for _ in range(200):
+        results = batch.make_moves(batch.random_moves(rng))
+        ended = results >= 0
+        finished += ended.sum()
+        assert (batch.mask[ended] == 0).all() and (batch.moves[ended] == 0).all()
+        assert (batch.check_winners() == RUNNING).all()
+    assert finished > 64
+
+def test_playout_finishes_every_game():
+    boards = [Board.from_moves(moves) for moves in ([3, 3, 2], [0, 1, 0, 1, 0, 1, 0], [])]
+    batch = BoardBatch.from_boards(boards)
+    assert batch.winners.tolist() == [RUNNING, 1, RUNNING]
+    winners = batch.playout(np.random.default_rng(1))
+    assert (winners >= 0).all() and winners[1] == 1
+    for i in range(len(batch)):
+        board = batch.board(i)
+        assert board.check_winner() == winners[i]
+        assert (batch.grids()[i] == board.board).all()
+
+def test_board_size_limit():
+    assert fits(6, 7) and not fits(7, 8)
+    with pytest.raises(ValueError):
+        BoardBatch(1, 7, 8)
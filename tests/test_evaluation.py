@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pytest
+
+from board import Board
+from ai_agent import Connect4AI
+from evaluation import evaluate_boards, evaluate_lines, EvaluationCache, MOVE_WIN_SCORE
+
+# player 1 has 0, 1 and 2 on the bottom row, player 2 (the AI) must take 3
+OPEN_THREE = [0, 6, 1, 6, 2]
+
+@pytest.mark.parametrize('strategy', ['hill_climbing', 'minimax'])
+def test_every_strategy_blocks_a_playable_three(strategy):
+    board = Board.from_moves(OPEN_THREE)
+    ai = Connect4AI(strategy=strategy, max_depth=2)
+    assert [ai.get_move(board) for _ in range(10)] == [3] * 10
+
+def test_annealing_blocks_a_playable_three():
+    # annealing samples about 20 random moves, now and then none of them is 3
+    random.seed(0)
+    board = Board.from_moves(OPEN_THREE)
+    ai = Connect4AI(strategy='simulated_annealing')
+    assert [ai.get_move(board) for _ in range(50)].count(3) >= 45
+
+def test_opponent_threat_outweighs_everything_when_they_move():
+    board = Board.from_moves(OPEN_THREE)
+    ai = Connect4AI()
+    scores = {col: ai.evaluate_position(board, col) for col in board.get_valid_moves()}
+    assert max(scores, key=scores.get) == 3
+    assert all(score <= -MOVE_WIN_SCORE // 2 for col, score in scores.items() if col != 3)
+
+def test_side_to_move_decides_who_owns_the_threat():
+    grid = Board.from_moves(OPEN_THREE).board
+    neutral = evaluate_boards(grid)
+    assert evaluate_boards(grid, to_move=2) == neutral
+    assert evaluate_boards(grid, to_move=1) == neutral - MOVE_WIN_SCORE
+
+def test_sparse_evaluation_sees_the_threat():
+    board = Board(12, 12)
+    for col in (0, 11, 1, 11, 2):
+        board.make_move(col)
+    board.make_move(5)  # player 2 misses the block, player 1 is to move
+    assert evaluate_lines(board) <= -MOVE_WIN_SCORE
+    board.undo_move(5)
+    board.make_move(3)
+    assert evaluate_lines(board) > -MOVE_WIN_SCORE
+
+def test_stack_scores_match_single_grids():
+    rng = random.Random(1)
+    grids = []
+    for _ in range(20):
+        board = Board()
+        for _ in range(rng.randrange(30)):
+            if board.is_terminal():
+                break
+            board.make_move(rng.choice(board.get_valid_moves()))
+        grids.append(board.board)
+    stacked = evaluate_boards(np.array(grids), to_move=1)
+    assert stacked.tolist() == [evaluate_boards(grid, to_move=1) for grid in grids]
+
+def test_cache_evicts_least_recently_used():
+    cache = EvaluationCache(2)
+    cache.put(1, 10)
+    cache.put(2, 20)
+    assert cache.get(1) == 10
+    cache.put(3, 30)
+    assert cache.get(2) is None and cache.get(1) == 10 and cache.get(3) == 30
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_search_keys_fold_mirrors_only_on_odd_widths():
+    # on 6 columns the center term scores column 3 but not its mirror 2
+    ai = Connect4AI()
+    board, mirror = Board.from_moves([3], 6, 6), Board.from_moves([2], 6, 6)
+    assert evaluate_boards(board.board, player=1) != evaluate_boards(mirror.board, player=1)
+    assert ai.tt_key(board)[0] != ai.tt_key(mirror)[0]
+    board, mirror = Board.from_moves([2]), Board.from_moves([4])
+    assert ai.tt_key(board)[0] == ai.tt_key(mirror)[0]
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from board import Board
+from game_log import GameLogWriter, GameLogReader, HEADER, UNFINISHED, pack_moves, unpack_moves
+
+def random_game(rng, rows=6, cols=7, connect=4, first_player=1, max_moves=None):
+    board = Board(rows, cols, connect)
+    board.set_first_player(first_player)
+    while not board.is_terminal() and (max_moves is None or board.moves < max_moves):
+        board.make_move(rng.choice(board.get_valid_moves()))
+    return board
+
+@pytest.mark.parametrize('rows, cols, connect', [(6, 7, 4), (4, 11, 4), (6, 7, 5), (5, 5, 3)])
+def test_compact_key_round_trip(rows, cols, connect):
+    rng = random.Random(cols)
+    for _ in range(50):
+        board = random_game(rng, rows, cols, connect, rng.choice((1, 2)),
+                            rng.randrange(rows * cols + 1))
+        copy = Board.from_key(board.compact_key(), rows, cols, connect)
+        assert copy.compact_key() == board.compact_key()
+        assert (copy.board == board.board).all()
+        assert copy.current_player == board.current_player
+        assert copy.check_winner() == board.check_winner()
+
+def test_pack_moves_round_trip():
+    moves = [0, 15, 3, 10, 7]
+    assert unpack_moves(pack_moves(moves), len(moves)) == moves
+
+@pytest.mark.parametrize('rows, cols, connect', [(6, 7, 4), (4, 11, 4), (6, 7, 5)])
+def test_log_round_trip(tmp_path, rows, cols, connect):
+    rng = random.Random(connect)
+    games = [random_game(rng, rows, cols, connect, 1 + i % 2, None if i % 3 else 9)
+             for i in range(20)]
+    path = tmp_path / 'games.bin'
+    writer = GameLogWriter(path, rows, cols, connect)
+    for board in games:
+        writer.append(board)
+    writer.close()
+
+    log = GameLogReader(path)
+    assert len(log) == len(games)  # maps the file and reads the header
+    assert (log.rows, log.cols, log.connect) == (rows, cols, connect)
+    for i, board in enumerate(games):
+        record = log.records[i]
+        winner = board.check_winner()
+        assert record['result'] == (UNFINISHED if winner is None else winner)
+        assert log.moves(i) == [col for _, col, _, _ in board.history]
+        replay = log.board(i)
+        assert replay.compact_key() == board.compact_key() == record['key']
+        assert replay.check_winner() == winner
+    del record  # records view the map, close refuses while one is alive
+    log.close()
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = tmp_path / 'games.bin'
+    writer = GameLogWriter(path)
+    writer.append(Board.from_moves([3, 3, 4]))
+    writer.close()
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02\x03')  # a crash mid-record
+    writer = GameLogWriter(path)
+    writer.append(Board.from_moves([2]))
+    writer.close()
+    log = GameLogReader(path)
+    assert [log.moves(i) for i in range(len(log))] == [[3, 3, 4], [2]]
+    log.close()
+
+def test_mismatched_logs_are_refused(tmp_path):
+    path = tmp_path / 'games.bin'
+    GameLogWriter(path, 6, 7, 5).close()
+    with pytest.raises(ValueError):
+        GameLogWriter(path, 6, 7, 4)
+    writer = GameLogWriter(path, 6, 7, 5)
+    with pytest.raises(ValueError):
+        writer.append(Board())
+    writer.close()
+    assert path.stat().st_size == HEADER.size
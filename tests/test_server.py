@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from server import GameServer
+
+# The line-JSON protocol over a real TCP connection.
+
+def run(requests, **options):
+    # responses to requests sent one at a time over one connection
+    async def session():
+        server = GameServer(workers=1, **options)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(*server.address)
+            responses = []
+            for request in requests:
+                line = request if isinstance(request, bytes) else json.dumps(request).encode()
+                writer.write(line + b'\n')
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+            return responses
+        finally:
+            await server.close()
+    return asyncio.run(session())
+
+def test_game_flow():
+    new, move, ai, state, close, metrics = run([
+        {'op': 'new', 'id': 'a', 'engine': {'playouts': 100}},
+        {'op': 'move', 'session': 1, 'col': 3},
+        {'op': 'ai', 'session': 1, 'time_ms': 50},
+        {'op': 'state', 'session': 1},
+        {'op': 'close', 'session': 1},
+        {'op': 'metrics'},
+    ])
+    assert new['ok'] and new['id'] == 'a' and new['session'] == 1 and new['to_move'] == 1
+    assert move['moves'] == [3] and move['to_move'] == 2
+    assert ai['ok'] and ai['move'] in range(7) and ai['moves'] == [3, ai['move']]
+    assert state['moves'] == ai['moves'] and state['to_move'] == 1
+    assert close['ok']
+    assert metrics['searches'] == 1 and metrics['sessions'] == 0
+
+def test_bad_requests_get_error_replies():
+    requests = [
+        b'not json',
+        [1, 2],
+        {'op': 'move', 'session': [1], 'col': 3},
+        {'op': 'new', 'rows': True},
+        {'op': 'new', 'first_player': 3},
+        {'op': 'new', 'engine': {'solver_threshold': 42}},
+        {'op': 'new', 'engine': {'max_depth': 2}},
+        {'op': 'new', 'engine': {'strategy': 'random'}},
+        {'op': 'new', 'engine': {'depth': 3}},
+        {'op': 'new'},
+        {'op': 'move', 'session': True, 'col': 3},
+        {'op': 'move', 'session': 1, 'col': True},
+        {'op': 'move', 'session': 1, 'col': 9},
+        {'op': 'ai', 'session': 1, 'time_ms': -5},
+        {'op': 'frob', 'session': 1},
+        {'op': 'move', 'session': 1, 'col': 3},
+    ]
+    responses = run(requests)
+    assert [response['ok'] for response in responses] == [False] * 9 + [True] + [False] * 5 + [True]
+    assert all('error' in response for response in responses if not response['ok'])
+
+def test_full_queue_is_refused():
+    new, ai = run([{'op': 'new'}, {'op': 'ai', 'session': 1}], max_queue=0)
+    assert ai == {'ok': False, 'error': "server busy"}
@@ -0,0 +1,81 @@
+import random
+import time
+
+import pytest
+
+from board import Board
+from solver import Solver, SearchTimeout, solve
+from ai_agent import Connect4AI
+
+# The solver checked against a plain negamax over every move on small
+# boards, using the same score scale.
+
+def brute_force(board):
+    # score for the player to move, see Solver
+    cells = board.rows * board.cols
+    best = None
+    for col in board.get_valid_moves():
+        player = board.current_player
+        board.make_move(col)
+        winner = board.check_winner()
+        if winner == player:
+            score = (cells + 2 - board.moves) // 2
+        elif winner == 0:
+            score = 0
+        else:
+            score = -brute_force(board)
+        board.undo_move(col)
+        if best is None or score > best:
+            best = score
+    return best
+
+def random_positions(rows, cols, connect, empty, count, seed):
+    # undecided positions with `empty` cells left
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board(rows, cols, connect)
+        while not board.is_terminal() and rows * cols - board.moves > empty:
+            board.make_move(rng.choice(board.get_valid_moves()))
+        if not board.is_terminal():
+            positions.append(board)
+    return positions
+
+@pytest.mark.parametrize('rows, cols, connect', [(4, 5, 4), (3, 5, 3), (6, 7, 4)])
+def test_solver_matches_brute_force(rows, cols, connect):
+    solver = Solver(1)
+    for board in random_positions(rows, cols, connect, 9, 12, rows * cols):
+        score, move = solver.solve(board)
+        assert score == brute_force(board)
+        # the move achieves the score
+        player = board.current_player
+        board.make_move(move)
+        if board.check_winner() == player:
+            child = (rows * cols + 2 - board.moves) // 2
+        else:
+            child = -brute_force(board) if not board.is_terminal() else 0
+        board.undo_move(move)
+        assert child == score
+
+def test_finished_game():
+    board = Board.from_moves([0, 1, 0, 1, 0, 1, 0])
+    score, move = solve(board)
+    assert move is None and score < 0
+
+def test_deadline_raises_and_restores_the_board():
+    board = Board.from_moves([3, 3, 2, 4])
+    key = board.compact_key()
+    solver = Solver(1)
+    solver.deadline = time.perf_counter()
+    with pytest.raises(SearchTimeout):
+        solver.solve(board)
+    assert board.compact_key() == key and board.moves == 4
+
+def test_engine_falls_back_to_search_in_time():
+    # far too many empty cells to solve in the budget
+    board = Board.from_moves([3, 3, 2, 4, 3])
+    ai = Connect4AI(time_limit_ms=100, solver_threshold=42)
+    start = time.perf_counter()
+    move, stats = ai.get_move(board, return_stats=True)
+    assert time.perf_counter() - start < 1.0
+    assert stats.source == 'search' and board.is_valid_move(move)
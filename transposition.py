@@ -0,0 +1,120 @@
+import ctypes
+from multiprocessing.sharedctypes import RawArray
+
+EXACT = 0
+LOWER = 1  # score is a lower bound (search failed high)
+UPPER = 2  # score is an upper bound (search failed low)
+
+# rough size of one stored entry: the tuple plus its key and score objects
+ENTRY_BYTES = 160
+
+class TranspositionTable:
+    # Two slots per bucket: one keeps the deepest search seen for the bucket,
+    # the other is always overwritten with the latest result. Entries are
+    # (key, depth, score, flag, move) tuples, moves in canonical orientation.
+    def __init__(self, size_mb=16):
+        self.buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_BYTES))
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.hits = 0
+        self.probes = 0
+
+    def clear(self):
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.hits = 0
+        self.probes = 0
+
+    def probe(self, key):
+        self.probes += 1
+        index = key % self.buckets
+        entry = self.deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self.recent[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = key % self.buckets
+        entry = (key, depth, score, flag, move)
+        deep = self.deep[index]
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                self.recent[index] = deep  # demote instead of dropping
+            self.deep[index] = entry
+        else:
+            self.recent[index] = entry
+
+class SharedTranspositionTable:
+    # Same two-slot buckets as TranspositionTable but kept in shared memory so
+    # every process of a search pool reads and writes one table. Each slot
+    # holds the packed entry and key ^ entry, there is no lock: a slot torn by
+    # two concurrent writers fails the key check and reads as a miss.
+    def __init__(self, size_mb=16, buffers=None):
+        if buffers is None:
+            slots = max(2, size_mb * 1024 * 1024 // 16)
+            buffers = (RawArray('Q', slots), RawArray('Q', slots))
+        self.buffers = buffers  # pass these to worker processes
+        self.checks, self.data = buffers
+        self.buckets = len(self.data) // 2
+        self.hits = 0
+        self.probes = 0
+
+    def clear(self):
+        ctypes.memset(self.checks, 0, ctypes.sizeof(self.checks))
+        ctypes.memset(self.data, 0, ctypes.sizeof(self.data))
+        self.hits = 0
+        self.probes = 0
+
+    def probe(self, key):
+        self.probes += 1
+        index = (key % self.buckets) * 2
+        for slot in (index, index + 1):
+            data = self.data[slot]
+            if data and self.checks[slot] ^ data == key:
+                self.hits += 1
+                return (key,) + unpack_entry(data)
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = (key % self.buckets) * 2
+        data = pack_entry(depth, score, flag, move)
+        deep = self.data[index]
+        deep_key = self.checks[index] ^ deep
+        if not deep or deep_key == key or depth >= deep & 0xFF:
+            if deep and deep_key != key:
+                self.checks[index + 1] = self.checks[index]
+                self.data[index + 1] = deep
+            slot = index
+        else:
+            slot = index + 1
+        self.data[slot] = data
+        self.checks[slot] = key ^ data
+
+def pack_entry(depth, score, flag, move):
+    # depth: 8 bits, flag: 2 bits, move + 1: 8 bits, score: 32 bits offset by
+    # 2**31 with the extremes reserved for -inf and inf
+    if score == float('inf'):
+        packed = 0xFFFFFFFF
+    elif score == float('-inf'):
+        packed = 0
+    else:
+        packed = min(max(int(score) + 2 ** 31, 1), 0xFFFFFFFE)
+    move = 0 if move is None else move + 1
+    # bit 18 is always set so a stored entry is never 0
+    return depth | flag << 8 | move << 10 | 1 << 18 | packed << 32
+
+def unpack_entry(data):
+    packed = data >> 32
+    if packed == 0xFFFFFFFF:
+        score = float('inf')
+    elif packed == 0:
+        score = float('-inf')
+    else:
+        score = packed - 2 ** 31
+    move = (data >> 10) & 0xFF
+    return data & 0xFF, score, (data >> 8) & 0x3, None if move == 0 else move - 1